@@ -0,0 +1 @@
+"""Benchmarks of Quick Polls. Run modules from the repository root, e.g. `python -m benchmarks.sqlite_writes`."""
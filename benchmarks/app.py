@@ -0,0 +1,14 @@
+"""App with a database in the given folder, configured for benchmarks."""
+import os
+
+
+def create_bench_app(folder):
+    """Creating the app on a new SQLite database. Must be called once per process"""
+    from qp.config import Config
+    Config.DATABASE_URL = f"sqlite:///{os.path.join(folder, 'bench.db')}"
+    # Nothing should be mailed or throttled while benchmarking
+    Config.MAIL_OUTBOX_WORKER = False
+    Config.RATE_LIMITS = {}
+
+    from qp import create_app
+    return create_app()
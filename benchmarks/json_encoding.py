@@ -0,0 +1,81 @@
+"""Encode time of API responses with every installed JSON encoder.
+
+    python -m benchmarks.json_encoding --polls 1000 --repeat 50
+
+The payload is a list of fully dumped polls, as /api/polls?expand=full returns them. "flask" is the Flask encoder,
+which was used by API responses before the encoders.
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+
+from benchmarks.app import create_bench_app
+from benchmarks.seed import seed
+
+
+def load_payload(polls_count):
+    from qp.api.database import db_session
+    from qp.api.models.polls import Poll
+    from qp.api.schemas.polls import PollSchema
+
+    session = db_session.create_session()
+    try:
+        polls = session.query(Poll).options(*PollSchema.loader_options()).order_by(Poll.id).limit(polls_count).all()
+        return {"polls": PollSchema().dump(polls, many=True), "next_cursor": None}
+    finally:
+        session.close()
+
+
+def measure(encode, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode()
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    return {
+        "mean_ms": round(sum(durations) / len(durations) * 1000, 3),
+        "min_ms": round(durations[0] * 1000, 3),
+        "median_ms": round(durations[len(durations) // 2] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--polls", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--votes", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        app = create_bench_app(folder)
+        seed(users_count=args.users, polls_count=args.polls, votes_count=args.votes, comments_count=0,
+             rng=random.Random(0))
+        payload = load_payload(args.polls)
+
+    from flask.json import dumps as flask_dumps
+    from qp.api.tools.response import get_encoders
+
+    sort_keys = app.config["JSON_SORT_KEYS"]
+    encoders = {encoder.name: encoder for encoder in get_encoders()}
+    with app.app_context():
+        results = {"flask": dict(measure(lambda: flask_dumps(payload), args.repeat),
+                                 bytes=len(flask_dumps(payload).encode()))}
+    for name, encoder in encoders.items():
+        results[name] = dict(measure(lambda: encoder.dumps(payload, sort_keys=sort_keys), args.repeat),
+                             bytes=len(encoder.dumps(payload, sort_keys=sort_keys)))
+
+    print(json.dumps({
+        "benchmark": "json_encoding",
+        "polls": len(payload["polls"]),
+        "repeat": args.repeat,
+        "sort_keys": sort_keys,
+        "results": results,
+    }))
+
+
+if __name__ == "__main__":
+    main()
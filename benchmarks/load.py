@@ -0,0 +1,114 @@
+"""Latency and throughput of the main API endpoints and pages on a seeded dataset.
+
+    python -m benchmarks.load --users 1000 --polls 2000 --votes 20000 --comments 5000 --requests 200
+    python -m benchmarks.load --scenarios api_polls page_poll --output results.json
+
+Results are printed as JSON, so runs on different commits can be compared.
+"""
+import argparse
+import json
+import math
+import random
+import subprocess
+import tempfile
+import time
+
+from benchmarks.app import create_bench_app
+from benchmarks.seed import PASSWORD, seed, get_user_email
+
+
+def percentile(durations, p):
+    """Nearest-rank percentile of sorted durations"""
+    return durations[max(0, math.ceil(p / 100 * len(durations)) - 1)]
+
+
+def get_scenarios(client, rng, user_ids, poll_ids, option_ids, auth_headers):
+    """Functions making one request each"""
+    return {
+        "api_polls": lambda: client.get("/api/polls"),
+        "api_poll": lambda: client.get(f"/api/polls/{rng.choice(poll_ids)}"),
+        "api_vote": lambda: client.post(f"/api/polls/vote/{rng.choice(option_ids)}", headers=auth_headers),
+        "api_login": lambda: client.post("/api/login", json={"email": get_user_email(rng.choice(user_ids)),
+                                                             "password": PASSWORD}),
+        "page_polls": lambda: client.get("/polls"),
+        "page_poll": lambda: client.get(f"/polls/{rng.choice(poll_ids)}"),
+    }
+
+
+def run(make_request, requests_count, warmup):
+    for _ in range(warmup):
+        make_request().close()
+
+    durations = []
+    statuses = {}
+    started = time.perf_counter()
+    for _ in range(requests_count):
+        request_started = time.perf_counter()
+        response = make_request()
+        durations.append(time.perf_counter() - request_started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        response.close()
+    elapsed = time.perf_counter() - started
+
+    durations.sort()
+    return {
+        "requests": requests_count,
+        "statuses": statuses,
+        "ops_per_second": round(requests_count / elapsed, 1),
+        "p50_ms": round(percentile(durations, 50) * 1000, 2),
+        "p95_ms": round(percentile(durations, 95) * 1000, 2),
+        "p99_ms": round(percentile(durations, 99) * 1000, 2),
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--polls", type=int, default=2000)
+    parser.add_argument("--votes", type=int, default=20000)
+    parser.add_argument("--comments", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per scenario")
+    parser.add_argument("--scenarios", nargs="+", help="scenarios to run, all by default")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the dataset and requests")
+    parser.add_argument("--output", help="file to write results to")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as folder:
+        app = create_bench_app(folder)
+        seeding_started = time.perf_counter()
+        user_ids, poll_ids, option_ids = seed(args.users, args.polls, args.votes, args.comments, rng)
+        seeding_time = time.perf_counter() - seeding_started
+
+        client = app.test_client()
+        tokens = client.post("/api/login", json={"email": get_user_email(user_ids[0]), "password": PASSWORD}).get_json()
+        client.set_cookie("localhost", "access_token_cookie", tokens["access_token"])
+        auth_headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+        scenarios = get_scenarios(client, rng, user_ids, poll_ids, option_ids, auth_headers)
+        names = args.scenarios or list(scenarios)
+        results = {name: run(scenarios[name], args.requests, args.warmup) for name in names}
+
+    output = json.dumps({
+        "benchmark": "load",
+        "commit": get_commit(),
+        "dataset": {"users": args.users, "polls": args.polls, "votes": args.votes, "comments": args.comments,
+                    "seed": args.seed, "seconds": round(seeding_time, 3)},
+        "results": results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
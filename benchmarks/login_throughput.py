@@ -0,0 +1,69 @@
+"""Password verification throughput of concurrent logins for different hashing pool sizes.
+
+    python -m benchmarks.login_throughput --threads 16 --logins 20 --workers 0 1 2 4
+"""
+import argparse
+import json
+import threading
+import time
+
+from qp.api.tools import errors, passwords
+from qp.config import Config
+
+PASSWORD = "benchmark-password"
+
+
+def worker(hashed_password, logins, result):
+    for _ in range(logins):
+        try:
+            passwords.verify_password(hashed_password, PASSWORD)
+            result["ok"] += 1
+        except errors.PasswordHashingBusyError:
+            result["rejected"] += 1
+
+
+def measure(threads_count, logins, workers, queue_size, method):
+    # The logins model request threads of a server
+    passwords.init(method, workers=workers, queue_size=queue_size, server_threads=threads_count)
+    hashed_password = passwords.hash_password(PASSWORD)
+
+    results = [{"ok": 0, "rejected": 0} for _ in range(threads_count)]
+    threads = [threading.Thread(target=worker, args=(hashed_password, logins, result)) for result in results]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    ok = sum(result["ok"] for result in results)
+    return {
+        "workers": workers,
+        "logins": ok,
+        "rejected": sum(result["rejected"] for result in results),
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round(ok / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16, help="concurrent request threads")
+    parser.add_argument("--logins", type=int, default=20, help="logins per thread")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4], help="pool sizes, 0 is inline")
+    parser.add_argument("--queue-size", type=int, default=Config.PASSWORD_HASH_QUEUE_SIZE)
+    parser.add_argument("--method", default=Config.PASSWORD_HASH_METHOD)
+    args = parser.parse_args()
+
+    results = [measure(args.threads, args.logins, workers, args.queue_size, args.method) for workers in args.workers]
+    passwords.init(workers=0)
+    print(json.dumps({
+        "benchmark": "login_throughput",
+        "method": args.method,
+        "threads": args.threads,
+        "results": results,
+    }))
+
+
+if __name__ == "__main__":
+    main()
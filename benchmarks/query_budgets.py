@@ -0,0 +1,221 @@
+"""SQL statement budgets of the API resources of qp/api/handlers/polls.py and users.py.
+
+    python -m benchmarks.query_budgets
+
+Every resource method is requested on a seeded dataset of two sizes in the same database. The check fails if a
+method has no budget in qp/api/handlers/budgets.py, goes over it, or makes more statements on the larger dataset.
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+
+import sqlalchemy as sa
+
+from benchmarks.app import create_bench_app
+from benchmarks.seed import PASSWORD, seed
+
+# Background dataset added before each round and size of the fixture of users, polls, options, votes and comments
+ROUNDS = (
+    (dict(users_count=20, polls_count=40, votes_count=200, comments_count=100), 2),
+    (dict(users_count=200, polls_count=400, votes_count=4000, comments_count=1000), 8),
+)
+BLUEPRINTS = ("polls_resource", "users_resource")
+OWNER_CREDENTIALS = {"email": "admin@change.email", "password": "admin"}
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.count = 0
+        sa.event.listen(engine, "before_cursor_execute", self.on_execute)
+
+    def on_execute(self, *args):
+        self.count += 1
+
+
+def create_fixture(factor):
+    """Author of factor polls with factor options each, voted by factor users and commented factor times"""
+    from qp.api.database import db_session
+    from qp.api.models.polls import Poll, Option, Vote, Comment
+    from qp.api.models.users import User, generate_password
+    from qp.api.tools.database import reconcile_counters
+
+    session = db_session.create_session()
+    try:
+        hashed_password = generate_password(PASSWORD)
+
+        def add_user(username):
+            user = User(email=f"{username}@bench.local", username=username, hashed_password=hashed_password)
+            session.add(user)
+            return user
+
+        author, other, victim = (add_user(f"budget{factor}{suffix}") for suffix in ("", "o", "v"))
+        voters = [add_user(f"budget{factor}u{i}") for i in range(factor)]
+        polls = []
+        for i in range(factor):
+            poll = Poll(title=f"Budget poll {i}", author=author)
+            for j in range(min(factor, Poll.max_options_count)):
+                poll.options.append(Option(title=f"Option {j + 1}"))
+            session.add(poll)
+            polls.append(poll)
+        session.flush()
+
+        comments = []
+        for poll in polls:
+            for i, voter in enumerate(voters):
+                session.add(Vote(user_id=voter.id, poll_id=poll.id, option_id=poll.options[i % len(poll.options)].id))
+            for i in range(factor):
+                comment = Comment(text=f"Comment {i}", user_id=author.id, poll_id=poll.id)
+                session.add(comment)
+                comments.append(comment)
+        session.flush()
+
+        fixture = dict(factor=factor, author_id=author.id, author=author.username, email=author.email,
+                       other=other.username, victim=victim.username, poll_id=polls[0].id, last_poll_id=polls[-1].id,
+                       option_id=polls[0].options[-1].id, comment_id=comments[0].id, last_comment_id=comments[-1].id)
+        session.commit()
+        reconcile_counters(session)
+        return fixture
+    finally:
+        session.close()
+
+
+def get_requests(f):
+    """Requests of resource methods in order of running: (key, http method, path, json, acting user)"""
+    return [
+        ("PollResource.get", "GET", f"/api/polls/{f['poll_id']}", None, "author"),
+        ("PollListResource.get", "GET", "/api/polls", None, None),
+        ("CommentListResource.get", "GET", f"/api/polls/{f['poll_id']}/comments", None, None),
+        ("CommentResource.get", "GET", f"/api/comments/{f['comment_id']}", None, None),
+        ("UserResource.get", "GET", f"/api/users/{f['author']}", None, "owner"),
+        ("UsersListResource.get", "GET", "/api/users", None, "owner"),
+        ("UserPollsResource.get", "GET", f"/api/users/{f['author']}/polls", None, "owner"),
+        ("UserLoginResource.post", "POST", "/api/login", {"email": f["email"], "password": PASSWORD}, None),
+
+        ("PollListResource.post", "POST", "/api/polls",
+         {"title": "Budget poll", "options": [{"title": "First"}, {"title": "Second"}]}, "author"),
+        ("PollResource.put", "PUT", f"/api/polls/{f['poll_id']}", {"title": "Budget poll edited"}, "author"),
+        ("PollVoteResource.post", "POST", f"/api/polls/vote/{f['option_id']}", None, "author"),
+        ("PollCompleteResource.put", "PUT", f"/api/polls/{f['poll_id']}/complete", None, "author"),
+        ("PollResumeResource.put", "PUT", f"/api/polls/{f['poll_id']}/resume", None, "author"),
+        ("CommentListResource.post", "POST", f"/api/polls/{f['poll_id']}/comments", {"text": "Budget"}, "author"),
+        ("CommentResource.put", "PUT", f"/api/comments/{f['comment_id']}", {"text": "Budget edited"}, "author"),
+        ("CommentResource.delete", "DELETE", f"/api/comments/{f['last_comment_id']}", None, "author"),
+        ("PollResource.delete", "DELETE", f"/api/polls/{f['last_poll_id']}", None, "author"),
+
+        ("UserResource.put", "PUT", f"/api/users/{f['other']}", {"bio": "Budget"}, "owner"),
+        ("UsersListResource.post", "POST", "/api/users",
+         {"email": f"budget{f['factor']}n@bench.local", "username": f"budget{f['factor']}n", "password": PASSWORD},
+         "owner"),
+        ("UserProfileResource.put", "PUT", f"/api/users/{f['other']}/profile",
+         {"username": f["other"], "bio": "Budget profile"}, "owner"),
+        ("UserVerifyResource.put", "PUT", f"/api/users/{f['other']}/verify", None, "owner"),
+        ("UserCancelVerificationResource.put", "PUT", f"/api/users/{f['other']}/cancel_verification", None, "owner"),
+        ("UserBanResource.put", "PUT", f"/api/users/{f['other']}/ban", None, "owner"),
+        ("UserUnbanResource.put", "PUT", f"/api/users/{f['other']}/unban", None, "owner"),
+        ("UserChangeGroupResource.put", "PUT", f"/api/users/{f['other']}/change_group", {"group": 1}, "owner"),
+        ("UserChangePointsResource.put", "PUT", f"/api/users/{f['other']}/change_points",
+         {"action": 1, "count": 5}, "owner"),
+        ("SendCustomEmailResource.post", "POST", f"/api/users/{f['other']}/send_email",
+         {"subject": "Budget", "text": "Budget"}, "owner"),
+        ("UserRegisterResource.post", "POST", "/api/register",
+         {"email": f"budget{f['factor']}r@bench.local", "username": f"budget{f['factor']}r", "password": PASSWORD},
+         None),
+        ("UserSendResetPasswordEmailResource.post", "POST", "/api/send_reset_password_email", {"email": f["email"]},
+         None),
+        ("UserResetPasswordResource.post", "POST", "/api/reset_password",
+         {"token": f["reset_token"], "new_password": PASSWORD}, None),
+        ("UserChangePasswordResource.put", "PUT", f"/api/users/{f['author']}/change_password",
+         {"old_password": PASSWORD, "new_password": PASSWORD}, "author"),
+        ("UserSendConfirmationEmailResource.post", "POST", "/api/send_confirmation_email", None, "author"),
+        ("UserConfirmEmailResource.post", "POST", "/api/confirm_email", {"token": f["confirmation_token"]}, None),
+        ("UserEmailResource.put", "PUT", f"/api/users/{f['author']}/email",
+         {"email": f"budget{f['factor']}e@bench.local"}, "author"),
+        ("UserResource.delete", "DELETE", f"/api/users/{f['victim']}", None, "owner"),
+    ]
+
+
+def get_resource_keys(app):
+    """Resource methods of the polls and users APIs from the URL map, as "Resource.method" """
+    keys = set()
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint.split(".")[0] not in BLUEPRINTS:
+            continue
+        resource = app.view_functions[rule.endpoint].view_class
+        keys.update(f"{resource.__name__}.{method.lower()}" for method in resource.methods)
+    return sorted(keys)
+
+
+def get_access_token(client, credentials):
+    return client.post("/api/login", json=credentials).get_json()["access_token"]
+
+
+def check_budgets():
+    """Measuring statement counts of all resource methods, returns results by key and budget errors"""
+    with tempfile.TemporaryDirectory() as folder:
+        app = create_bench_app(folder)
+
+        from qp.api.database import db_session
+        from qp.api.handlers.budgets import QUERY_BUDGETS
+        from qp.api.models.users import User
+        from qp.api.tools import cache
+
+        keys = get_resource_keys(app)
+        client = app.test_client()
+        counter = StatementCounter(db_session.get_engine())
+        rng = random.Random(0)
+
+        counts = []
+        errors = []
+        for background, factor in ROUNDS:
+            seed(rng=rng, **background)
+            fixture = create_fixture(factor)
+            with app.app_context():
+                fixture["reset_token"] = User.get_reset_token(fixture["author_id"])
+                fixture["confirmation_token"] = User.get_email_confirmation_token(fixture["author_id"])
+            tokens = {"owner": get_access_token(client, OWNER_CREDENTIALS),
+                      "author": get_access_token(client, {"email": fixture["email"], "password": PASSWORD})}
+
+            round_counts = {}
+            for key, method, path, data, acting_user in get_requests(fixture):
+                headers = {"Authorization": f"Bearer {tokens[acting_user]}"} if acting_user else {}
+                for request_cache in (cache.users, cache.banned_users, cache.auth_versions, cache.responses):
+                    request_cache.clear()
+                counter.count = 0
+                response = client.open(path, method=method, json=data, headers=headers)
+                round_counts[key] = counter.count
+                if response.status_code != 200:
+                    errors.append(f"{key}: status {response.status_code} on {factor}x data: {response.get_data(True)}")
+            counts.append(round_counts)
+
+    results = {}
+    if not keys:
+        errors.append("no resources found")
+    for key in keys:
+        budget = QUERY_BUDGETS.get(key)
+        small, large = (round_counts.get(key) for round_counts in counts)
+        if budget is None:
+            errors.append(f"{key}: no budget")
+        elif small is None or large is None:
+            errors.append(f"{key}: no measured statement count")
+        else:
+            if large > small:
+                errors.append(f"{key}: {small} statements on small data, {large} on large data")
+            if max(small, large) > budget:
+                errors.append(f"{key}: {max(small, large)} statements, budget is {budget}")
+        results[key] = {"budget": budget, "statements": [small, large]}
+    return results, errors
+
+
+def main():
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+
+    results, errors = check_budgets()
+    print(json.dumps({"benchmark": "query_budgets", "results": results, "errors": errors}, indent=2))
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Synthetic dataset created through the models."""
+import random
+from datetime import datetime, timedelta
+
+from qp.api.database import db_session
+from qp.api.models.polls import Poll, Option, Vote, Comment
+from qp.api.models.users import User, generate_password
+from qp.api.tools.database import reconcile_counters
+
+PASSWORD = "benchmark-password"
+BATCH_SIZE = 5000
+
+
+def get_user_email(user_id):
+    return f"user{user_id}@bench.local"
+
+
+def insert(session, model, rows):
+    for i in range(0, len(rows), BATCH_SIZE):
+        session.bulk_insert_mappings(model, rows[i:i + BATCH_SIZE])
+        session.commit()
+
+
+def seed(users_count, polls_count, votes_count, comments_count, rng=None):
+    """Adding users, polls with options, votes and comments with ids following the existing ones.
+    All users have the PASSWORD. Returns ids of created users, polls and options.
+    """
+    rng = rng or random.Random(0)
+    session = db_session.create_session()
+    try:
+        started_at = datetime.utcnow()
+        first_user_id = (session.query(User.id).order_by(User.id.desc()).limit(1).scalar() or 0) + 1
+        first_poll_id = (session.query(Poll.id).order_by(Poll.id.desc()).limit(1).scalar() or 0) + 1
+        first_option_id = (session.query(Option.id).order_by(Option.id.desc()).limit(1).scalar() or 0) + 1
+
+        hashed_password = generate_password(PASSWORD)
+        user_ids = list(range(first_user_id, first_user_id + users_count))
+        insert(session, User, [
+            dict(id=user_id, email=get_user_email(user_id), username=f"user{user_id}",
+                 hashed_password=hashed_password, created_at=started_at - timedelta(seconds=user_id),
+                 verified=rng.random() < 0.1, email_confirmed=rng.random() < 0.5,
+                 banned=False, points=100, group=0)
+            for user_id in user_ids])
+
+        poll_ids = list(range(first_poll_id, first_poll_id + polls_count))
+        polls, options, poll_options = [], [], {}
+        option_id = first_option_id
+        for poll_id in poll_ids:
+            polls.append(dict(id=poll_id, title=f"Poll {poll_id}", description="Benchmark poll",
+                              author_id=rng.choice(user_ids), created_at=started_at - timedelta(seconds=poll_id),
+                              private=rng.random() < 0.1, completed=False, deleted=False))
+            poll_options[poll_id] = []
+            for i in range(rng.randint(1, Poll.max_options_count)):
+                options.append(dict(id=option_id, poll_id=poll_id, title=f"Option {i + 1}"))
+                poll_options[poll_id].append(option_id)
+                option_id += 1
+        insert(session, Poll, polls)
+        insert(session, Option, options)
+
+        # One vote of a user per poll
+        votes_count = min(votes_count, users_count * polls_count)
+        voted = set()
+        while len(voted) < votes_count:
+            voted.add((rng.choice(user_ids), rng.choice(poll_ids)))
+        insert(session, Vote, [dict(user_id=user_id, poll_id=poll_id, option_id=rng.choice(poll_options[poll_id]))
+                               for user_id, poll_id in voted])
+
+        insert(session, Comment, [
+            dict(text=f"Comment {i}", user_id=rng.choice(user_ids), poll_id=rng.choice(poll_ids),
+                 created_at=started_at - timedelta(seconds=i))
+            for i in range(comments_count)])
+
+        reconcile_counters(session)
+        return user_ids, poll_ids, list(range(first_option_id, option_id))
+    finally:
+        session.close()
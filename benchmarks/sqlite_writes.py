@@ -0,0 +1,94 @@
+"""Concurrent write throughput of SQLite with and without the performance profile.
+
+    python -m benchmarks.sqlite_writes --threads 8 --writes 200
+    python -m benchmarks.sqlite_writes --threads 8 --writes 200 --no-performance-mode
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from qp.api.database import db_session
+from qp.api.models.polls import Poll, Option
+from qp.api.models.users import User
+from qp.api.tools.database import save_vote
+
+
+def seed(users_count):
+    session = db_session.create_session()
+    try:
+        users = [User(email=f"user{i}@bench.local", username=f"user{i}", hashed_password="-")
+                 for i in range(users_count)]
+        session.add_all(users)
+        session.flush()
+        poll = Poll(title="Benchmark", author_id=users[0].id)
+        poll.options.append(Option(title="First option"))
+        poll.options.append(Option(title="Second option"))
+        session.add(poll)
+        session.commit()
+        return [user.id for user in users], poll.id, [option.id for option in poll.options]
+    finally:
+        session.close()
+
+
+def vote(user_id, poll_id, option_id):
+    session = db_session.create_session()
+    try:
+        save_vote(session, user_id, poll_id, option_id)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def worker(user_id, poll_id, option_ids, writes, result):
+    for i in range(writes):
+        try:
+            db_session.run_write(vote, user_id, poll_id, option_ids[i % len(option_ids)])
+            result["ok"] += 1
+        except Exception:
+            result["failed"] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200, help="writes per thread")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--no-performance-mode", dest="performance_mode", action="store_false")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        db_session.global_init(f"sqlite:///{os.path.join(folder, 'bench.db')}", pool_class="QueuePool",
+                               pool_size=args.threads, sqlite_performance_mode=args.performance_mode,
+                               write_retries=args.retries)
+        user_ids, poll_id, option_ids = seed(args.threads)
+
+        results = [{"ok": 0, "failed": 0} for _ in range(args.threads)]
+        threads = [threading.Thread(target=worker, args=(user_id, poll_id, option_ids, args.writes, result))
+                   for user_id, result in zip(user_ids, results)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    ok = sum(result["ok"] for result in results)
+    print(json.dumps({
+        "benchmark": "sqlite_writes",
+        "performance_mode": args.performance_mode,
+        "threads": args.threads,
+        "writes": ok,
+        "failed": sum(result["failed"] for result in results),
+        "seconds": round(elapsed, 3),
+        "writes_per_second": round(ok / elapsed, 1),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Throughput of static files served by the app, with and without a logged in user.
+
+    python -m benchmarks.static_files --requests 2000
+    python -m benchmarks.static_files --requests 2000 --logged-in
+
+Run it on a revision before the request classification to get the baseline.
+"""
+import argparse
+import json
+import tempfile
+import time
+
+from flask_jwt_extended import create_access_token
+
+from benchmarks.app import create_bench_app
+
+STATIC_URLS = ("/static/css/styles.css", "/static/avatars/default.png", "/static/favicon.ico")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--logged-in", action="store_true", help="send access token cookie of the owner")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        app = create_bench_app(folder)
+        client = app.test_client()
+        if args.logged_in:
+            with app.app_context():
+                client.set_cookie("localhost", "access_token_cookie", create_access_token(identity=1))
+
+        for url in STATIC_URLS:
+            assert client.get(url).status_code == 200, url
+
+        started = time.perf_counter()
+        for i in range(args.requests):
+            client.get(STATIC_URLS[i % len(STATIC_URLS)]).close()
+        elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        "benchmark": "static_files",
+        "logged_in": args.logged_in,
+        "requests": args.requests,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(args.requests / elapsed, 1),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,10 @@ from flask import Flask
 from flask_babel import Babel
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from qp.api.database import db_session
+from qp.api.tools import cache, metrics, passwords, profiler, rate_limit, response
 from qp.api.tools.database import create_owner_user
 from .config import Config
 
@@ -19,14 +21,44 @@ def create_app():
     """App creation"""
     app.config.from_object(Config)
 
-    db_session.global_init("qp/db/app.db")
+    db_session.global_init(app.config["DATABASE_URL"],
+                           pool_class=app.config["DATABASE_POOL_CLASS"],
+                           pool_size=app.config["DATABASE_POOL_SIZE"],
+                           pool_pre_ping=app.config["DATABASE_POOL_PRE_PING"],
+                           sqlite_pragmas=app.config["SQLITE_PRAGMAS"],
+                           sqlite_performance_mode=app.config["SQLITE_PERFORMANCE_MODE"],
+                           write_retries=app.config["DATABASE_WRITE_RETRIES"],
+                           write_retry_delay=app.config["DATABASE_WRITE_RETRY_DELAY"])
+    app.teardown_appcontext(db_session.remove_session)
+    passwords.init(app.config["PASSWORD_HASH_METHOD"],
+                   salt_length=app.config["PASSWORD_SALT_LENGTH"],
+                   workers=app.config["PASSWORD_HASH_WORKERS"],
+                   queue_size=app.config["PASSWORD_HASH_QUEUE_SIZE"],
+                   server_threads=app.config["SERVER_THREADS"])
+    response.init(app.config["JSON_ENCODER"])
     create_owner_user()
+    rate_limit.limiter.max_keys = app.config["RATE_LIMIT_MAX_KEYS"]
+    if app.config["TRUSTED_PROXIES"]:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["TRUSTED_PROXIES"])
+    cache.users.configure(app.config["USER_CACHE_SIZE"], app.config["USER_CACHE_TTL"])
+    cache.banned_users.configure(1, app.config["USER_CACHE_TTL"])
+    cache.auth_versions.configure(1, app.config["USER_CACHE_TTL"])
+    cache.responses.configure(app.config["RESPONSE_CACHE_SIZE"], app.config["RESPONSE_CACHE_TTL"],
+                              max_bytes=app.config["RESPONSE_CACHE_MAX_BYTES"])
 
     jwt.init_app(app)
     babel.init_app(app)
     mail.init_app(app)
 
+    if app.config["METRICS_ENABLED"]:
+        metrics.init_app(app, db_session.get_engine())
+    profiler.init_app(app, db_session.get_engine())
+
     from qp.tools import settings
+    from qp.tools import commands
+
+    from qp.api.tools import outbox
+    outbox.init_worker(app)
 
     from qp.views import default
     from qp.views import users
@@ -35,6 +67,8 @@ def create_app():
     from qp.api.handlers import errors as api_errors
     from qp.api.handlers import users as api_users
     from qp.api.handlers import polls as api_polls
+    from qp.api.handlers import system as api_system
+    from qp.api.handlers import mail as api_mail
 
     # Registering views blueprints
     app.register_blueprint(default.blueprint)
@@ -46,5 +80,7 @@ def create_app():
     app.register_blueprint(api_errors.blueprint)
     app.register_blueprint(api_users.blueprint, url_prefix=api_url_prefix)
     app.register_blueprint(api_polls.blueprint, url_prefix=api_url_prefix)
+    app.register_blueprint(api_system.blueprint, url_prefix=api_url_prefix)
+    app.register_blueprint(api_mail.blueprint, url_prefix=api_url_prefix)
 
     return app
@@ -1,2 +1,3 @@
 from ..models.users import User
 from ..models.polls import Poll, Option, Vote, Comment
+from ..models.mail import OutboxMessage, Broadcast
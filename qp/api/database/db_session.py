@@ -1,34 +1,134 @@
+import random
+import threading
+import time
+
 import sqlalchemy as sa
 import sqlalchemy.ext.declarative as dec
 import sqlalchemy.orm as orm
+from flask import g, has_app_context
+from sqlalchemy import pool
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
 
 SqlAlchemyBase = dec.declarative_base()
 
+# Pragmas of the SQLite performance profile
+SQLITE_PERFORMANCE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 268435456,
+    "cache_size": -65536,
+}
+
 __factory = None
+__engine = None
+__writer_lock = threading.RLock()
+__serialize_writes = False
+__write_retries = 0
+__write_retry_delay = 0.05
 
 
-def global_init(db_file):
+def global_init(db_url, pool_class=None, pool_size=None, pool_pre_ping=False, sqlite_pragmas=None,
+                sqlite_performance_mode=False, write_retries=0, write_retry_delay=0.05):
     """Database init"""
-    global __factory
+    global __factory, __engine, __serialize_writes, __write_retries, __write_retry_delay
 
     if __factory:
         return
 
-    if not db_file or not db_file.strip():
-        raise Exception("No database file specified.")
+    if not db_url or not db_url.strip():
+        raise Exception("No database specified.")
 
-    conn_str = f"sqlite:///{db_file.strip()}?check_same_thread=False"
-    print(f"Connecting to the database at {conn_str}")
+    db_url = db_url.strip()
+    print(f"Connecting to the database at {db_url}")
 
-    engine = sa.create_engine(conn_str, echo=False)
+    engine_options = dict(echo=False, pool_pre_ping=pool_pre_ping)
+    if db_url.startswith("sqlite"):
+        engine_options["connect_args"] = {"check_same_thread": False}
+    if pool_class:
+        engine_options["poolclass"] = getattr(pool, pool_class)
+        if pool_size and engine_options["poolclass"] is pool.QueuePool:
+            engine_options["pool_size"] = pool_size
+
+    engine = sa.create_engine(db_url, **engine_options)
+    pragmas = dict(sqlite_pragmas or {})
+    if sqlite_performance_mode and engine.dialect.name == "sqlite":
+        pragmas = {**SQLITE_PERFORMANCE_PRAGMAS, **pragmas}
+        __serialize_writes = True
+    if pragmas:
+        set_sqlite_pragmas(engine, pragmas)
+    __write_retries = write_retries
+    __write_retry_delay = write_retry_delay
     __factory = orm.sessionmaker(bind=engine)
+    __engine = engine
 
     from . import __all_models
 
     SqlAlchemyBase.metadata.create_all(engine)
 
 
+def set_sqlite_pragmas(engine, pragmas):
+    """Setting PRAGMA values on every new SQLite connection"""
+    @sa.event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for key, value in pragmas.items():
+            cursor.execute(f"PRAGMA {key}={value}")
+        cursor.close()
+
+
+def get_engine():
+    return __engine
+
+
 def create_session() -> Session:
+    """Session of the current app context, or a new one outside of it"""
     global __factory
-    return __factory()
+    if not has_app_context():
+        return __factory()
+    if "db_session" not in g:
+        g.db_session = __factory()
+    return g.db_session
+
+
+def rollback_session():
+    """Rolling back the current app context session if it was used"""
+    session = g.get("db_session") if has_app_context() else None
+    if session is not None:
+        session.rollback()
+
+
+def remove_session(exception=None):
+    """Closing the current app context session"""
+    session = g.pop("db_session", None)
+    if session is None:
+        return
+    if exception is not None:
+        session.rollback()
+    session.close()
+
+
+def is_locked_error(error):
+    """Checking if database error is caused by a locked SQLite database"""
+    return isinstance(error, OperationalError) and "locked" in str(error.orig).lower()
+
+
+def run_write(func, *args, serialize=True, **kwargs):
+    """Running write transaction, retrying it with backoff while the database is locked.
+
+    In SQLite performance mode writers of the process are serialized, so they don't fight for the database lock.
+    """
+    attempt = 0
+    while True:
+        try:
+            if serialize and __serialize_writes:
+                with __writer_lock:
+                    return func(*args, **kwargs)
+            return func(*args, **kwargs)
+        except OperationalError as e:
+            if not is_locked_error(e) or attempt >= __write_retries:
+                raise
+            rollback_session()
+            time.sleep(__write_retry_delay * 2 ** attempt * (1 + random.random()))
+            attempt += 1
@@ -0,0 +1,47 @@
+"""Maximum SQL statements per request of the API resources.
+
+Checked by `python -m benchmarks.query_budgets` with empty user and response caches, so token revocation check
+and reading current_user cost a statement each. A resource method without budget fails the check, as does
+a statement count growing with the size of the dataset. Update budgets together with the handlers.
+"""
+
+QUERY_BUDGETS = {
+    # qp/api/handlers/polls.py
+    "PollResource.get": 4,
+    "PollResource.put": 5,
+    "PollResource.delete": 5,
+    "PollListResource.get": 1,
+    "PollListResource.post": 9,
+    "PollVoteResource.post": 9,
+    "PollCompleteResource.put": 5,
+    "PollResumeResource.put": 5,
+    "CommentListResource.get": 2,
+    "CommentListResource.post": 6,
+    "CommentResource.get": 2,
+    "CommentResource.put": 3,
+    "CommentResource.delete": 6,
+
+    # qp/api/handlers/users.py
+    "UserResource.get": 5,
+    "UserResource.put": 4,
+    "UserResource.delete": 5,
+    "UsersListResource.get": 2,
+    "UsersListResource.post": 5,
+    "UserProfileResource.put": 5,
+    "UserEmailResource.put": 5,
+    "UserChangePasswordResource.put": 4,
+    "UserVerifyResource.put": 4,
+    "UserCancelVerificationResource.put": 4,
+    "UserBanResource.put": 5,
+    "UserUnbanResource.put": 5,
+    "UserChangeGroupResource.put": 5,
+    "UserChangePointsResource.put": 4,
+    "UserPollsResource.get": 4,
+    "SendCustomEmailResource.post": 3,
+    "UserRegisterResource.post": 4,
+    "UserLoginResource.post": 1,
+    "UserSendResetPasswordEmailResource.post": 2,
+    "UserResetPasswordResource.post": 2,
+    "UserSendConfirmationEmailResource.post": 3,
+    "UserConfirmEmailResource.post": 3,
+}
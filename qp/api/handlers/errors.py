@@ -1,6 +1,7 @@
 from flask import Blueprint
 from sqlalchemy.exc import IntegrityError
 
+from ..database import db_session
 from ..tools.errors import ApiError, DatabaseError
 
 blueprint = Blueprint(
@@ -11,9 +12,11 @@ blueprint = Blueprint(
 
 @blueprint.app_errorhandler(ApiError)
 def app_errors_handler(error):
+    db_session.rollback_session()
     return error.create_response()
 
 
 @blueprint.app_errorhandler(IntegrityError)
 def database_errors_handler(error):
+    db_session.rollback_session()
     return DatabaseError().create_response()
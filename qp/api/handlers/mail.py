@@ -0,0 +1,63 @@
+from flask import Blueprint, request
+from flask_jwt_extended import current_user
+from flask_restful import Api, Resource
+from marshmallow.exceptions import ValidationError
+from sqlalchemy import func
+
+from ..database import db_session
+from ..models.mail import Broadcast
+from ..models.users import User, get_group
+from ..schemas.mail import BroadcastSchema, BroadcastCreateSchema
+from ..tools import errors, outbox
+from ..tools.decorators import admin_required, database_write
+from ..tools.mail import MessageGenerator
+from ..tools.response import jsonify, make_success_message
+
+blueprint = Blueprint(
+    "mail_resource",
+    __name__,
+)
+api = Api(blueprint)
+
+
+class BroadcastResource(Resource):
+    @admin_required()
+    def get(self, broadcast_id):
+        session = db_session.create_session()
+        broadcast = session.query(Broadcast).get(broadcast_id)
+        if not broadcast:
+            raise errors.BroadcastNotFoundError
+
+        return jsonify({
+            "broadcast": BroadcastSchema().dump(broadcast)
+        })
+
+
+class BroadcastListResource(Resource):
+    @admin_required()
+    @database_write()
+    def post(self):
+        try:
+            data = BroadcastCreateSchema().load(request.get_json())
+        except ValidationError as e:
+            raise errors.InvalidRequestError(e.messages)
+
+        if data.get("group") is not None and not get_group(id=data["group"]):
+            raise errors.GroupNotFoundError
+
+        session = db_session.create_session()
+        # Message is rendered once for all recipients
+        message = MessageGenerator().custom(data["subject"], data["text"])
+        broadcast = Broadcast(author_id=current_user.id, subject=message.subject, html=message.html,
+                              group=data.get("group"), verified=data.get("verified"),
+                              email_confirmed=data.get("email_confirmed"))
+        broadcast.total = session.query(func.count(User.id)).filter(*broadcast.get_recipients_filter()).scalar()
+        session.add(broadcast)
+        session.commit()
+        outbox.wake()
+
+        return make_success_message({"broadcast": BroadcastSchema().dump(broadcast)})
+
+
+api.add_resource(BroadcastListResource, "/broadcast_email")
+api.add_resource(BroadcastResource, "/broadcast_email/<int:broadcast_id>")
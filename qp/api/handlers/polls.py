@@ -1,16 +1,21 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, request
 from flask_jwt_extended import current_user
 from flask_restful import Api, Resource
 from marshmallow.exceptions import ValidationError
-from sqlalchemy import desc
+from sqlalchemy import select, true, false, orm
 
 from ..database import db_session
 from ..models.polls import Poll, Option, Vote, Comment
 from ..models.users import User, ModeratorGroup, Points
-from ..schemas.polls import PollSchema, CommentSchema
+from ..schemas.polls import PollSchema, PollSummarySchema, CommentSchema, PollListArgsSchema, CommentListArgsSchema
 from ..tools import errors
-from ..tools.decorators import user_required
-from ..tools.response import make_success_message
+from ..tools.cache import invalidate_user, invalidate_poll, tag_response
+from ..tools.decorators import guest_required, user_required, database_write, anonymous_cache
+from ..tools.database import bump_poll_versions, save_vote
+from ..tools.metrics import measure
+from ..tools.pagination import paginate
+from ..tools.rate_limit import rate_limit
+from ..tools.response import jsonify, make_success_message, make_etag, make_not_modified, make_etag_response
 
 blueprint = Blueprint(
     "polls_resource",
@@ -20,17 +25,39 @@ api = Api(blueprint)
 
 
 class PollResource(Resource):
+    @anonymous_cache()
+    @guest_required()
     def get(self, poll_id):
+        # Votes bump the poll version, so the viewer id and the version identify the viewer's voted option
+        viewer_id = current_user.id if current_user else None
         session = db_session.create_session()
 
-        poll = session.query(Poll).get(poll_id)
+        if request.if_none_match:
+            versions = session.query(Poll.version, User.version).join(Poll.author).filter(Poll.id == poll_id).first()
+            if not versions:
+                raise errors.PollNotFoundError
+            not_modified = make_not_modified(make_etag("poll", poll_id, *versions, viewer_id))
+            if not_modified:
+                return not_modified
+
+        poll = session.query(Poll).options(*PollSchema.loader_options()).filter(Poll.id == poll_id).one_or_none()
         if not poll:
             raise errors.PollNotFoundError
+        tag_response(("poll", poll.id), ("user", poll.author_id))
+
+        voted_option_id = None
+        if viewer_id is not None:
+            voted_option_id = session.query(Vote.option_id) \
+                .filter(Vote.user_id == viewer_id, Vote.poll_id == poll.id).scalar()
 
-        data = PollSchema().dump(poll)
-        return jsonify({"poll": data})
+        with measure("serialization"):
+            data = PollSchema().dump(poll)
+        data["voted_option_id"] = voted_option_id
+        return make_etag_response({"poll": data},
+                                  make_etag("poll", poll.id, poll.version, poll.author.version, viewer_id))
 
     @user_required()
+    @database_write()
     def put(self, poll_id):
         data = request.get_json()
         try:
@@ -48,11 +75,14 @@ class PollResource(Resource):
             raise errors.AccessDeniedError
 
         session.query(Poll).filter(Poll.id == poll.id).update(data)
+        bump_poll_versions(session, Poll.id == poll.id)
         session.commit()
+        invalidate_poll(poll_id)
 
         return make_success_message()
 
     @user_required()
+    @database_write()
     def delete(self, poll_id):
         session = db_session.create_session()
         poll = session.query(Poll).get(poll_id)
@@ -64,20 +94,55 @@ class PollResource(Resource):
             raise errors.AccessDeniedError
 
         poll.deleted = True
+        bump_poll_versions(session, Poll.id == poll.id)
         session.commit()
+        invalidate_poll(poll_id)
 
         return make_success_message()
 
 
 class PollListResource(Resource):
+    @anonymous_cache()
     def get(self):
+        try:
+            args = PollListArgsSchema().load(request.args)
+        except ValidationError as e:
+            raise errors.InvalidRequestError(e.messages)
+
         session = db_session.create_session()
-        polls = session.query(Poll).order_by(desc(Poll.created_at)).all()
-        return jsonify({
-            "polls": PollSchema().dump(polls, many=True)
-        })
+        expand = "expand" in args
+        if expand:
+            query = session.query(Poll).options(*PollSchema.loader_options())
+        else:
+            query = PollSummarySchema.query(session)
+        for flag in ("private", "deleted", "completed"):
+            if flag in args:
+                # Literal flags let SQLite match the partial index of public polls
+                query = query.filter(getattr(Poll, flag) == (true() if args[flag] else false()))
+        if "author" in args:
+            query = query.filter(Poll.author_id == select([User.id]).where(User.username == args["author"]).as_scalar())
+
+        polls, next_cursor = paginate(query, Poll.created_at, Poll.id, args.get("cursor"), args["limit"])
+        tag_response("polls")
+        if expand:
+            versions = [(poll.id, poll.version, poll.author.version) for poll in polls]
+        else:
+            versions = [(row.id, row.version, row.author_version) for row in polls]
+        etag = make_etag("polls", expand, versions, next_cursor)
+        not_modified = make_not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        schema = PollSchema() if expand else PollSummarySchema()
+        with measure("serialization"):
+            data = schema.dump(polls, many=True)
+        return make_etag_response({
+            "polls": data,
+            "next_cursor": next_cursor
+        }, etag)
 
     @user_required()
+    @database_write()
     def post(self):
         data = request.get_json()
         try:
@@ -92,7 +157,9 @@ class PollListResource(Resource):
             if not Points.check(user.points, Points.create_poll):
                 raise errors.NotEnoughPointsError
             user.points += Points.create_poll
+        user.version = User.version + 1
 
+        data = dict(data)
         options = data.pop("options")
         poll = Poll(**data)
         poll.author_id = current_user.id
@@ -101,38 +168,37 @@ class PollListResource(Resource):
 
         session.add(poll)
         session.commit()
+        invalidate_user(current_user.id)
 
+        poll = session.query(Poll).options(*PollSchema.loader_options()).filter(Poll.id == poll.id).one()
         return make_success_message({"poll": PollSchema().dump(poll)})
 
 
 class PollVoteResource(Resource):
     @user_required()
+    @rate_limit("vote", key="user")
+    @database_write()
     def post(self, option_id):
         session = db_session.create_session()
 
-        option = session.query(Option).filter(Option.id == option_id).first()
+        option = session.query(Option.poll_id, Poll.completed).join(Poll).filter(Option.id == option_id).first()
         if not option:
             raise errors.OptionNotFoundError
 
-        if option.poll.completed:
+        if option.completed:
             raise errors.PollCompleted
 
-        votes = session.query(Vote).join(Option).filter(Option.poll_id == option.poll_id,
-                                                        Vote.user_id == current_user.id).all()
-        for vote in votes:
-            session.delete(vote)
-        new_vote = Vote(user_id=current_user.id, option_id=option_id)
-        if not votes:
-            user = session.query(User).get(current_user.id)
-            user.points += Points.vote
-        session.add(new_vote)
+        save_vote(session, current_user.id, option.poll_id, option_id)
         session.commit()
+        invalidate_user(current_user.id)
+        invalidate_poll(option.poll_id)
 
         return make_success_message()
 
 
 class PollCompleteResource(Resource):
     @user_required()
+    @database_write()
     def put(self, poll_id):
         session = db_session.create_session()
 
@@ -145,13 +211,16 @@ class PollCompleteResource(Resource):
             raise errors.AccessDeniedError
 
         poll.completed = True
+        bump_poll_versions(session, Poll.id == poll.id)
         session.commit()
+        invalidate_poll(poll_id)
 
         return make_success_message()
 
 
 class PollResumeResource(Resource):
     @user_required()
+    @database_write()
     def put(self, poll_id):
         session = db_session.create_session()
 
@@ -164,13 +233,38 @@ class PollResumeResource(Resource):
             raise errors.AccessDeniedError
 
         poll.completed = False
+        bump_poll_versions(session, Poll.id == poll.id)
         session.commit()
+        invalidate_poll(poll_id)
 
         return make_success_message()
 
 
 class CommentListResource(Resource):
+    def get(self, poll_id):
+        try:
+            args = CommentListArgsSchema().load(request.args)
+        except ValidationError as e:
+            raise errors.InvalidRequestError(e.messages)
+
+        session = db_session.create_session()
+
+        if not session.query(Poll.id).filter(Poll.id == poll_id).first():
+            raise errors.PollNotFoundError
+
+        query = session.query(Comment).options(orm.joinedload(Comment.user).raiseload("*"), orm.raiseload("*")) \
+            .filter(Comment.poll_id == poll_id)
+        comments, next_cursor = paginate(query, Comment.created_at, Comment.id, args.get("cursor"), args["limit"])
+        with measure("serialization"):
+            data = CommentSchema().dump(comments, many=True)
+        return jsonify({
+            "comments": data,
+            "next_cursor": next_cursor
+        })
+
     @user_required()
+    @rate_limit("comment", key="user")
+    @database_write()
     def post(self, poll_id):
         data = request.get_json()
         try:
@@ -184,10 +278,12 @@ class CommentListResource(Resource):
         if not poll:
             raise errors.PollNotFoundError
 
-        new_comment = Comment(text=data["text"], user_id=current_user.id)
-        poll.comments.append(new_comment)
+        session.add(Comment(text=data["text"], user_id=current_user.id, poll_id=poll.id))
+        poll.comment_count = Poll.comment_count + 1
+        bump_poll_versions(session, Poll.id == poll.id)
 
         session.commit()
+        invalidate_poll(poll_id)
 
         return make_success_message()
 
@@ -204,6 +300,7 @@ class CommentResource(Resource):
         return jsonify({"comment": data})
 
     @user_required()
+    @database_write()
     def put(self, comment_id):
         data = request.get_json()
         try:
@@ -226,6 +323,7 @@ class CommentResource(Resource):
         return make_success_message()
 
     @user_required()
+    @database_write()
     def delete(self, comment_id):
         session = db_session.create_session()
 
@@ -236,8 +334,13 @@ class CommentResource(Resource):
         if comment.user_id != current_user.id and not ModeratorGroup.is_belong(current_user.group):
             raise errors.AccessDeniedError
 
+        session.query(Poll).filter(Poll.id == comment.poll_id).update(
+            {Poll.comment_count: Poll.comment_count - 1}, synchronize_session=False)
+        bump_poll_versions(session, Poll.id == comment.poll_id)
+        poll_id = comment.poll_id
         session.delete(comment)
         session.commit()
+        invalidate_poll(poll_id)
 
         return make_success_message()
 
@@ -247,5 +350,5 @@ api.add_resource(PollListResource, "/polls")
 api.add_resource(PollVoteResource, "/polls/vote/<int:option_id>")
 api.add_resource(PollCompleteResource, "/polls/<int:poll_id>/complete")
 api.add_resource(PollResumeResource, "/polls/<int:poll_id>/resume")
-api.add_resource(CommentListResource, "/polls/<int:poll_id>/comment")
+api.add_resource(CommentListResource, "/polls/<int:poll_id>/comment", "/polls/<int:poll_id>/comments")
 api.add_resource(CommentResource, "/comments/<int:comment_id>")
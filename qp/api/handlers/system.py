@@ -0,0 +1,26 @@
+from flask import Blueprint
+from flask_restful import Api, Resource
+
+from ..tools import cache
+from ..tools.decorators import admin_required
+from ..tools.response import jsonify
+
+blueprint = Blueprint(
+    "system_resource",
+    __name__,
+)
+api = Api(blueprint)
+
+
+class CacheStatsResource(Resource):
+    @admin_required()
+    def get(self):
+        return jsonify({
+            "users": cache.users.stats(),
+            "banned_users": cache.banned_users.stats(),
+            "auth_versions": cache.auth_versions.stats(),
+            "responses": cache.responses.stats()
+        })
+
+
+api.add_resource(CacheStatsResource, "/system/cache")
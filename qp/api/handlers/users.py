@@ -1,18 +1,25 @@
-from flask import Blueprint, jsonify, request, render_template
-from flask_jwt_extended import create_access_token, create_refresh_token, current_user
+from flask import Blueprint, request, render_template
+from flask_jwt_extended import current_user
 from flask_restful import Api, Resource
 from marshmallow.exceptions import ValidationError
-from sqlalchemy import desc
+from sqlalchemy import desc, select
 
-from qp import mail
 from ..database import db_session
-from ..models.polls import Poll
+from ..models.polls import Poll, Vote
 from ..models.users import User, generate_password, ModeratorGroup, get_group
-from ..schemas.polls import PollSchema
-from ..schemas.users import UserSchema, UserChangePasswordSchema, UserChangePointsSchema, CustomEmailSchema
-from ..tools import errors
-from ..tools.decorators import guest_required, user_required, moderator_required, admin_required
-from ..tools.response import make_success_message
+from ..schemas.polls import PollSchema, PollSummarySchema, PollListArgsSchema
+from ..schemas.users import UserSchema, UserSummarySchema, UserListArgsSchema, UserChangePasswordSchema, \
+    UserChangePointsSchema, CustomEmailSchema
+from ..tools import errors, outbox
+from ..tools.cache import invalidate_user, invalidate_banned_users, invalidate_auth_versions
+from ..tools.decorators import guest_required, user_required, moderator_required, admin_required, \
+    database_write
+from ..tools.database import bump_poll_versions
+from ..tools.metrics import measure
+from ..tools.pagination import paginate
+from ..tools.rate_limit import rate_limit
+from ..tools.response import jsonify, make_success_message, make_etag, make_not_modified, make_etag_response
+from ..tools.tokens import get_user_tokens
 from ..tools.mail import MessageGenerator
 
 blueprint = Blueprint(
@@ -22,13 +29,6 @@ blueprint = Blueprint(
 api = Api(blueprint)
 
 
-def get_user_tokens(user_data):
-    access_token = create_access_token(identity=user_data)
-    refresh_token = create_refresh_token(identity=user_data)
-    return {"access_token": access_token,
-            "refresh_token": refresh_token}
-
-
 class UserResource(Resource):
     @guest_required()
     def get(self, username):
@@ -37,13 +37,23 @@ class UserResource(Resource):
             exclude = []
 
         session = db_session.create_session()
-        user = session.query(User).filter(User.username == username).first()
+        if request.if_none_match:
+            versions = session.query(User.id, User.version).filter(User.username == username).first()
+            if not versions:
+                raise errors.UserNotFoundError
+            not_modified = make_not_modified(make_etag("user", *versions, exclude))
+            if not_modified:
+                return not_modified
+
+        user = session.query(User).options(*UserSchema.loader_options()).filter(User.username == username).first()
         if not user:
             raise errors.UserNotFoundError
-        data = UserSchema(exclude=exclude).dump(user)
-        return jsonify({"user": data})
+        with measure("serialization"):
+            data = UserSchema(exclude=exclude).dump(user)
+        return make_etag_response({"user": data}, make_etag("user", user.id, user.version, exclude))
 
     @admin_required()
+    @database_write(serialize=False)
     def put(self, username):
         data = request.get_json()
         try:
@@ -56,34 +66,68 @@ class UserResource(Resource):
         if not user:
             raise errors.UserNotFoundError
 
+        data = dict(data)
         if "password" in data:
             data["hashed_password"] = generate_password(data.pop("password"))
-        session.query(User).filter(User.username == username).update(data)
+        if "group" in data or "banned" in data:
+            data["auth_version"] = User.auth_version + 1
+        data["version"] = User.version + 1
+        session.query(User).filter(User.username == username).update(data, synchronize_session=False)
         session.commit()
+        invalidate_user(user.id)
+        invalidate_banned_users()
+        invalidate_auth_versions()
         return make_success_message()
 
     @admin_required()
+    @database_write()
     def delete(self, username):
         session = db_session.create_session()
         user = session.query(User).filter(User.username == username).first()
         if not user:
             raise errors.UserNotFoundError
 
+        # Polls show ids of their voters
+        bump_poll_versions(session, Poll.id.in_(select([Vote.poll_id]).where(Vote.user_id == user.id)))
         session.delete(user)
         session.commit()
+        invalidate_user(user.id)
+        invalidate_banned_users()
         return make_success_message()
 
 
 class UsersListResource(Resource):
     @moderator_required()
     def get(self):
+        try:
+            args = UserListArgsSchema().load(request.args)
+        except ValidationError as e:
+            raise errors.InvalidRequestError(e.messages)
+
         session = db_session.create_session()
-        users = session.query(User).order_by(User.created_at.desc()).all()
-        return jsonify({
-            "users": UserSchema().dump(users, many=True)
-        })
+        query = UserSummarySchema.query(session)
+        for field in ("group", "banned", "verified", "email_confirmed"):
+            if field in args:
+                query = query.filter(getattr(User, field) == args[field])
+        if "username" in args:
+            # Prefix search as a range, so the username index is used
+            query = query.filter(User.username >= args["username"], User.username < args["username"] + "\U0010ffff")
+
+        users, next_cursor = paginate(query, User.created_at, User.id, args.get("cursor"), args["limit"])
+        etag = make_etag("users", [(row.id, row.version) for row in users], next_cursor)
+        not_modified = make_not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        with measure("serialization"):
+            data = UserSummarySchema().dump(users, many=True)
+        return make_etag_response({
+            "users": data,
+            "next_cursor": next_cursor
+        }, etag)
 
     @admin_required()
+    @database_write(serialize=False)
     def post(self):
         data = request.get_json()
         try:
@@ -97,6 +141,7 @@ class UsersListResource(Resource):
         if result is not None:
             raise errors.UserAlreadyExistsError
 
+        data = dict(data)
         password = data.pop("password")
         user = User(**data)
         user.set_password(password)
@@ -108,6 +153,7 @@ class UsersListResource(Resource):
 
 class UserProfileResource(Resource):
     @user_required()
+    @database_write()
     def put(self, username):
         if current_user.username != username and not ModeratorGroup.is_belong(current_user.group):
             raise errors.AccessDeniedError
@@ -123,16 +169,20 @@ class UserProfileResource(Resource):
         if not user:
             raise errors.UserNotFoundError
 
+        data = dict(data)
         if "avatar_filename" in data and not data.get("avatar_filename", None):
             data.pop("avatar_filename")
+        data["version"] = User.version + 1
 
         session.query(User).filter(User.username == username).update(data)
         session.commit()
+        invalidate_user(user.id)
         return make_success_message()
 
 
 class UserEmailResource(Resource):
     @user_required()
+    @database_write()
     def put(self, username):
         if current_user.username != username:
             raise errors.AccessDeniedError
@@ -149,13 +199,16 @@ class UserEmailResource(Resource):
             raise errors.UserNotFoundError
 
         data["email_confirmed"] = False
+        data["version"] = User.version + 1
         session.query(User).filter(User.username == username).update(data)
         session.commit()
+        invalidate_user(user.id)
         return make_success_message()
 
 
 class UserChangePasswordResource(Resource):
     @user_required()
+    @database_write(serialize=False)
     def put(self, username):
         if current_user.username != username:
             raise errors.AccessDeniedError
@@ -182,6 +235,7 @@ class UserChangePasswordResource(Resource):
 
 class UserVerifyResource(Resource):
     @admin_required()
+    @database_write()
     def put(self, username):
         session = db_session.create_session()
 
@@ -190,13 +244,16 @@ class UserVerifyResource(Resource):
             raise errors.UserNotFoundError
 
         user.verified = True
+        user.version = User.version + 1
         session.commit()
+        invalidate_user(user.id)
 
         return make_success_message()
 
 
 class UserCancelVerificationResource(Resource):
     @admin_required()
+    @database_write()
     def put(self, username):
         session = db_session.create_session()
 
@@ -205,13 +262,16 @@ class UserCancelVerificationResource(Resource):
             raise errors.UserNotFoundError
 
         user.verified = False
+        user.version = User.version + 1
         session.commit()
+        invalidate_user(user.id)
 
         return make_success_message()
 
 
 class UserBanResource(Resource):
     @moderator_required()
+    @database_write()
     def put(self, username):
         session = db_session.create_session()
 
@@ -223,13 +283,19 @@ class UserBanResource(Resource):
             raise errors.AccessDeniedError
 
         user.banned = True
+        user.version = User.version + 1
+        user.auth_version += 1
         session.commit()
+        invalidate_user(user.id)
+        invalidate_banned_users()
+        invalidate_auth_versions()
 
         return make_success_message()
 
 
 class UserUnbanResource(Resource):
     @moderator_required()
+    @database_write()
     def put(self, username):
         session = db_session.create_session()
 
@@ -241,13 +307,19 @@ class UserUnbanResource(Resource):
             raise errors.AccessDeniedError
 
         user.banned = False
+        user.version = User.version + 1
+        user.auth_version += 1
         session.commit()
+        invalidate_user(user.id)
+        invalidate_banned_users()
+        invalidate_auth_versions()
 
         return make_success_message()
 
 
 class UserChangeGroupResource(Resource):
     @admin_required()
+    @database_write()
     def put(self, username):
         data = request.get_json()
         try:
@@ -270,13 +342,18 @@ class UserChangeGroupResource(Resource):
             raise errors.AccessDeniedError
 
         user.group = group_id
+        user.version = User.version + 1
+        user.auth_version += 1
 
         session.commit()
+        invalidate_user(user.id)
+        invalidate_auth_versions()
         return make_success_message()
 
 
 class UserChangePointsResource(Resource):
     @moderator_required()
+    @database_write()
     def put(self, username):
         data = request.get_json()
         try:
@@ -293,8 +370,10 @@ class UserChangePointsResource(Resource):
             raise errors.UserNotFoundError
 
         user.points += data["action"] * data["count"]
+        user.version = User.version + 1
 
         session.commit()
+        invalidate_user(user.id)
         return make_success_message()
 
 
@@ -304,20 +383,37 @@ class UserPollsResource(Resource):
         if not (current_user.username == username or ModeratorGroup.is_belong(current_user.group)):
             raise errors.AccessDeniedError
 
+        try:
+            args = PollListArgsSchema(only=("expand",)).load(request.args)
+        except ValidationError as e:
+            raise errors.InvalidRequestError(e.messages)
+
         session = db_session.create_session()
 
         user = session.query(User).filter(User.username == username).first()
         if not user:
             raise errors.UserNotFoundError
 
-        polls = session.query(Poll).filter(Poll.author_id == user.id).order_by(desc(Poll.created_at)).all()
-        return jsonify({
-            "polls": PollSchema().dump(polls, many=True)
-        })
+        etag = make_etag("user_polls", user.id, user.version, "expand" in args)
+        not_modified = make_not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        if "expand" in args:
+            query, schema = session.query(Poll).options(*PollSchema.loader_options()), PollSchema()
+        else:
+            query, schema = PollSummarySchema.query(session), PollSummarySchema()
+        polls = query.filter(Poll.author_id == user.id).order_by(desc(Poll.created_at), desc(Poll.id)).all()
+        with measure("serialization"):
+            data = schema.dump(polls, many=True)
+        return make_etag_response({
+            "polls": data
+        }, etag)
 
 
 class SendCustomEmailResource(Resource):
     @admin_required()
+    @database_write()
     def post(self, username):
         data = request.get_json()
         try:
@@ -331,15 +427,14 @@ class SendCustomEmailResource(Resource):
         if not user:
             raise errors.UserNotFoundError
 
-        try:
-            mail.send(MessageGenerator(user.email).custom(**data))
-        except Exception as e:
-            raise errors.SendingEmailError
+        outbox.send(MessageGenerator(user.email).custom(**data))
 
         return make_success_message()
 
 
 class UserRegisterResource(Resource):
+    @rate_limit("register")
+    @database_write(serialize=False)
     def post(self):
         data = request.get_json()
         try:
@@ -353,6 +448,7 @@ class UserRegisterResource(Resource):
         if result is not None:
             raise errors.UserAlreadyExistsError
 
+        data = dict(data)
         password = data.pop("password")
         user = User(**data)
         user.set_password(password)
@@ -360,15 +456,14 @@ class UserRegisterResource(Resource):
         session.commit()
 
         token = User.get_email_confirmation_token(user.id)
-        try:
-            mail.send(MessageGenerator(user.email).welcome(user, token))
-        except Exception as e:
-            pass
+        outbox.send(MessageGenerator(user.email).welcome(user, token))
 
         return make_success_message()
 
 
 class UserLoginResource(Resource):
+    @rate_limit("login")
+    @database_write(serialize=False)
     def post(self):
         data = request.get_json()
         try:
@@ -382,11 +477,15 @@ class UserLoginResource(Resource):
             raise errors.UserNotFoundError
         if not user.check_password(data["password"]):
             raise errors.WrongCredentialsError
+        if user.needs_rehash():
+            user.set_password(data["password"])
+            session.commit()
 
-        return jsonify(get_user_tokens(user.id))
+        return jsonify(get_user_tokens(user))
 
 
 class UserSendResetPasswordEmailResource(Resource):
+    @database_write()
     def post(self):
         data = request.get_json()
         try:
@@ -400,15 +499,13 @@ class UserSendResetPasswordEmailResource(Resource):
             raise errors.UserNotFoundError
 
         token = User.get_reset_token(user.id)
-        try:
-            mail.send(MessageGenerator(user.email).reset_password(user, token))
-        except Exception as e:
-            raise errors.SendingEmailError
+        outbox.send(MessageGenerator(user.email).reset_password(user, token))
 
         return make_success_message()
 
 
 class UserResetPasswordResource(Resource):
+    @database_write(serialize=False)
     def post(self):
         data = request.get_json()
         try:
@@ -433,21 +530,20 @@ class UserResetPasswordResource(Resource):
 
 class UserSendConfirmationEmailResource(Resource):
     @user_required()
+    @database_write()
     def post(self):
         user = current_user
         if user.email_confirmed:
             raise errors.EmailAlreadyConfirmedError
 
         token = User.get_email_confirmation_token(user.id)
-        try:
-            mail.send(MessageGenerator(user.email).confirm_email(user, token))
-        except Exception as e:
-            raise errors.SendingEmailError
+        outbox.send(MessageGenerator(user.email).confirm_email(user, token))
 
         return make_success_message()
 
 
 class UserConfirmEmailResource(Resource):
+    @database_write()
     def post(self):
         data = request.get_json()
 
@@ -461,7 +557,9 @@ class UserConfirmEmailResource(Resource):
             raise errors.UserNotFoundError
 
         user.email_confirmed = True
+        user.version = User.version + 1
         session.commit()
+        invalidate_user(user.id)
 
         return make_success_message()
 
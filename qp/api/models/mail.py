@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import sqlalchemy
+from sqlalchemy import false
+
+from .users import User
+from ..database.db_session import SqlAlchemyBase
+
+
+class OutboxMessage(SqlAlchemyBase):
+    __tablename__ = "outbox"
+    __table_args__ = (
+        # Messages waiting to be sent, in order of the next attempt
+        sqlalchemy.Index("ix_outbox_pending_next_attempt_at", "next_attempt_at",
+                         sqlite_where=sqlalchemy.text("sent_at IS NULL"),
+                         postgresql_where=sqlalchemy.text("sent_at IS NULL")),
+    )
+
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
+    subject = sqlalchemy.Column(sqlalchemy.String, nullable=False)
+    recipients = sqlalchemy.Column(sqlalchemy.String, nullable=False)
+    html = sqlalchemy.Column(sqlalchemy.Text, nullable=False)
+    created_at = sqlalchemy.Column(sqlalchemy.DateTime, default=datetime.utcnow)
+    attempts = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = sqlalchemy.Column(sqlalchemy.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = sqlalchemy.Column(sqlalchemy.DateTime, nullable=True)
+    last_error = sqlalchemy.Column(sqlalchemy.String, nullable=True)
+
+    recipients_separator = ","
+
+    def __repr__(self):
+        return f"<OutboxMessage> {self.id} {self.subject}"
+
+
+class Broadcast(SqlAlchemyBase):
+    __tablename__ = "broadcasts"
+
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
+    author_id = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey(User.id, ondelete="SET NULL"))
+    subject = sqlalchemy.Column(sqlalchemy.String, nullable=False)
+    html = sqlalchemy.Column(sqlalchemy.Text, nullable=False)
+    # Segment of users, None matches any value
+    group = sqlalchemy.Column(sqlalchemy.Integer, nullable=True)
+    verified = sqlalchemy.Column(sqlalchemy.Boolean, nullable=True)
+    email_confirmed = sqlalchemy.Column(sqlalchemy.Boolean, nullable=True)
+    status = sqlalchemy.Column(sqlalchemy.String, nullable=False, default="pending")
+    total = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
+    sent = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
+    failed = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
+    # Recipients are processed in order of id, progress is kept for resuming after restart
+    last_user_id = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
+    locked_until = sqlalchemy.Column(sqlalchemy.DateTime, nullable=True)
+    # Temporary errors since the last processed recipient, the broadcast fails after MAIL_OUTBOX_MAX_ATTEMPTS of them
+    attempts = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0, server_default="0")
+    last_error = sqlalchemy.Column(sqlalchemy.String, nullable=True)
+    created_at = sqlalchemy.Column(sqlalchemy.DateTime, default=datetime.utcnow)
+    finished_at = sqlalchemy.Column(sqlalchemy.DateTime, nullable=True)
+
+    segment_fields = ("group", "verified", "email_confirmed")
+
+    def get_recipients_filter(self):
+        """Conditions on users of the segment. Banned users never get broadcasts"""
+        conditions = [User.banned == false()]
+        for field in self.segment_fields:
+            value = getattr(self, field)
+            if value is not None:
+                conditions.append(getattr(User, field) == value)
+        return conditions
+
+    def __repr__(self):
+        return f"<Broadcast> {self.id} {self.subject}"
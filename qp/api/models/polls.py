@@ -9,6 +9,13 @@ from ..database.db_session import SqlAlchemyBase
 
 class Poll(SqlAlchemyBase):
     __tablename__ = "polls"
+    __table_args__ = (
+        sqlalchemy.Index("ix_polls_author_id_created_at", "author_id", "created_at"),
+        # Public polls list: not deleted and not private, newest first
+        sqlalchemy.Index("ix_polls_public_created_at", "created_at",
+                         sqlite_where=sqlalchemy.text("deleted = 0 AND private = 0"),
+                         postgresql_where=sqlalchemy.text("NOT deleted AND NOT private")),
+    )
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, index=True, autoincrement=True)
     title = sqlalchemy.Column(sqlalchemy.String, index=True, nullable=False)
@@ -18,6 +25,10 @@ class Poll(SqlAlchemyBase):
     private = sqlalchemy.Column(sqlalchemy.Boolean, default=False)
     deleted = sqlalchemy.Column(sqlalchemy.Boolean, default=False)
     created_at = sqlalchemy.Column(sqlalchemy.DateTime, default=datetime.utcnow)
+    participants_count = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0, server_default="0")
+    comment_count = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0, server_default="0")
+    # Bumped on votes, comments, edits, completion and resume, ETags of poll responses are derived from it
+    version = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=1, server_default="1")
 
     author = orm.relation(User)
     options = orm.relation("Option", back_populates="poll", passive_deletes=True)
@@ -37,10 +48,12 @@ class Option(SqlAlchemyBase):
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, index=True, autoincrement=True)
     title = sqlalchemy.Column(sqlalchemy.String, nullable=False)
-    poll_id = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey(Poll.id, ondelete="CASCADE"), nullable=False)
+    poll_id = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey(Poll.id, ondelete="CASCADE"), index=True,
+                                nullable=False)
+    vote_count = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0, server_default="0")
 
     poll = orm.relation(Poll)
-    users = orm.relation(User, secondary="votes", passive_deletes=True)
+    users = orm.relation(User, secondary="votes", viewonly=True)
 
     max_title_length = 100
 
@@ -50,21 +63,33 @@ class Option(SqlAlchemyBase):
 
 class Vote(SqlAlchemyBase):
     __tablename__ = "votes"
+    __table_args__ = (
+        sqlalchemy.Index("ix_votes_user_id_option_id", "user_id", "option_id"),
+        sqlalchemy.Index("uq_votes_user_id_poll_id", "user_id", "poll_id", unique=True),
+    )
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, index=True, autoincrement=True)
     user_id = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey(User.id, ondelete="CASCADE"), nullable=False)
     option_id = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey(Option.id, ondelete="CASCADE"),
-                                  nullable=False)
+                                  index=True, nullable=False)
+    poll_id = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey(Poll.id, ondelete="CASCADE"), nullable=False)
 
     user = orm.relation(User)
     option = orm.relation(Option)
 
+    # One vote of the user per poll: inserting it or moving it to another option
+    upsert = sqlalchemy.text("INSERT INTO votes (user_id, poll_id, option_id) VALUES (:user_id, :poll_id, :option_id) "
+                             "ON CONFLICT (user_id, poll_id) DO UPDATE SET option_id = excluded.option_id")
+
     def __repr__(self):
         return f"<Vote> {self.id} {self.user.username} {self.option.title} ({self.option.poll.title})"
 
 
 class Comment(SqlAlchemyBase):
     __tablename__ = "comments"
+    __table_args__ = (
+        sqlalchemy.Index("ix_comments_poll_id_created_at", "poll_id", "created_at"),
+    )
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, index=True, autoincrement=True)
     user_id = sqlalchemy.Column(sqlalchemy.Integer, sqlalchemy.ForeignKey(User.id), nullable=False)
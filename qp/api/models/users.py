@@ -3,14 +3,14 @@ from datetime import datetime
 from flask import current_app
 import sqlalchemy
 from sqlalchemy import orm
-from werkzeug.security import generate_password_hash, check_password_hash
 from itsdangerous import TimedSerializer
 
 from ..database.db_session import SqlAlchemyBase
+from ..tools import passwords
 
 
 def generate_password(password):
-    return generate_password_hash(password)
+    return passwords.hash_password(password)
 
 
 class Points:
@@ -38,6 +38,10 @@ class User(SqlAlchemyBase):
     banned = sqlalchemy.Column(sqlalchemy.Boolean, default=False)
     points = sqlalchemy.Column(sqlalchemy.Integer, default=Points.register)
     email_confirmed = sqlalchemy.Column(sqlalchemy.Boolean, default=False)
+    # Bumped on changes of permissions to revoke issued access tokens
+    auth_version = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0, server_default="0")
+    # Bumped on changes of the user and their polls, ETags of user responses are derived from it
+    version = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=1, server_default="1")
 
     polls = orm.relation("Poll", back_populates="author", order_by="desc(Poll.created_at)", passive_deletes=True)
 
@@ -49,7 +53,10 @@ class User(SqlAlchemyBase):
         self.hashed_password = generate_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.hashed_password, password)
+        return passwords.verify_password(self.hashed_password, password)
+
+    def needs_rehash(self):
+        return passwords.needs_rehash(self.hashed_password)
 
     @staticmethod
     def get_reset_token(user_id):
@@ -81,6 +88,24 @@ class User(SqlAlchemyBase):
         return f"<User> {self.id} {self.username}"
 
 
+class UserSnapshot:
+    """Detached read-only copy of user columns, safe to share between requests"""
+    __slots__ = tuple(column.key for column in User.__table__.columns if column.key != "hashed_password")
+
+    def __init__(self, user):
+        for key in self.__slots__:
+            object.__setattr__(self, key, getattr(user, key))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("User snapshot is read-only")
+
+    def __delattr__(self, key):
+        raise AttributeError("User snapshot is read-only")
+
+    def __repr__(self):
+        return f"<UserSnapshot> {self.id} {self.username}"
+
+
 class UserGroup:
     id = 0
     title = "User"
@@ -0,0 +1,18 @@
+import marshmallow
+from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
+
+from .users import CustomEmailSchema
+from ..models.mail import Broadcast
+
+
+class BroadcastSchema(SQLAlchemyAutoSchema):
+    class Meta:
+        model = Broadcast
+        include_fk = True
+        exclude = ("html", "locked_until")
+
+
+class BroadcastCreateSchema(CustomEmailSchema):
+    group = marshmallow.fields.Integer(allow_none=True)
+    verified = marshmallow.fields.Boolean(allow_none=True)
+    email_confirmed = marshmallow.fields.Boolean(allow_none=True)
@@ -1,16 +1,20 @@
+import marshmallow
 from marshmallow import validate
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema, auto_field, fields
+from sqlalchemy import orm
 
 from .users import UserSchema
 from ..models.polls import Poll, Option, Comment
+from ..models.users import User
+from ..tools.pagination import DEFAULT_LIMIT, MAX_LIMIT
 
 
 class OptionSchema(SQLAlchemyAutoSchema):
     class Meta:
         model = Option
+        dump_only = ("vote_count",)
 
     title = auto_field(validate=validate.Length(min=1, max=Option.max_title_length))
-    users = auto_field()
 
 
 class CommentSchema(SQLAlchemyAutoSchema):
@@ -24,11 +28,61 @@ class CommentSchema(SQLAlchemyAutoSchema):
 class PollSchema(SQLAlchemyAutoSchema):
     class Meta:
         model = Poll
-        dump_only = ("id", "author_id", "completed", "created_at", "comments", "author")
+        dump_only = ("id", "author_id", "completed", "created_at", "participants_count", "comment_count", "author",
+                     "version")
 
     title = auto_field(validate=validate.Length(min=1, max=Poll.max_title_length))
     description = auto_field(validate=validate.Length(max=Poll.max_description_length))
     author = fields.Nested(UserSchema, exclude=("email", "polls"))
     options = fields.Nested(OptionSchema, many=True, required=True,
                             validate=validate.Length(min=Poll.min_options_count, max=Poll.max_options_count))
-    comments = fields.Nested(CommentSchema, many=True)
+
+    @staticmethod
+    def loader_options():
+        """Loading everything the schema dumps in a fixed number of queries, other relationships raise"""
+        return (
+            orm.joinedload(Poll.author).raiseload("*"),
+            orm.selectinload(Poll.options).raiseload("*"),
+            orm.raiseload("*"),
+        )
+
+
+class PollSummarySchema(marshmallow.Schema):
+    """Poll fields for lists, dumped from rows of the column-only summary query"""
+    id = marshmallow.fields.Integer()
+    title = marshmallow.fields.String()
+    created_at = marshmallow.fields.DateTime()
+    completed = marshmallow.fields.Boolean()
+    private = marshmallow.fields.Boolean()
+    deleted = marshmallow.fields.Boolean()
+    participants_count = marshmallow.fields.Integer()
+    author = marshmallow.fields.Function(lambda row: {"username": row.author_username,
+                                                      "verified": row.author_verified})
+
+    @staticmethod
+    def query(session):
+        return session.query(Poll.id, Poll.title, Poll.created_at, Poll.completed, Poll.private, Poll.deleted,
+                             Poll.participants_count, Poll.version, User.username.label("author_username"),
+                             User.verified.label("author_verified"), User.version.label("author_version")) \
+            .join(Poll.author)
+
+
+class CommentListArgsSchema(marshmallow.Schema):
+    class Meta:
+        unknown = marshmallow.EXCLUDE
+
+    cursor = marshmallow.fields.String()
+    limit = marshmallow.fields.Integer(missing=DEFAULT_LIMIT, validate=validate.Range(min=1, max=MAX_LIMIT))
+
+
+class PollListArgsSchema(marshmallow.Schema):
+    class Meta:
+        unknown = marshmallow.EXCLUDE
+
+    cursor = marshmallow.fields.String()
+    limit = marshmallow.fields.Integer(missing=DEFAULT_LIMIT, validate=validate.Range(min=1, max=MAX_LIMIT))
+    private = marshmallow.fields.Boolean()
+    deleted = marshmallow.fields.Boolean()
+    completed = marshmallow.fields.Boolean()
+    author = marshmallow.fields.String()
+    expand = marshmallow.fields.String(validate=validate.OneOf(["full"]))
@@ -1,15 +1,19 @@
 import marshmallow
 from marshmallow import validate
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema, auto_field, fields
+from sqlalchemy import func, select, orm
 
+from ..models.polls import Poll
 from ..models.users import User
+from ..tools.pagination import DEFAULT_LIMIT, MAX_LIMIT
 
 
 class UserSchema(SQLAlchemyAutoSchema):
     class Meta:
         model = User
-        exclude = ("hashed_password",)
+        exclude = ("hashed_password", "auth_version")
         load_only = ("password",)
+        dump_only = ("version",)
 
     email = auto_field(validate=validate.Email())
     username = auto_field(validate=validate.Length(min=User.min_username_length, max=User.max_username_length))
@@ -18,6 +22,51 @@ class UserSchema(SQLAlchemyAutoSchema):
 
     polls = fields.Nested("PollSchema", many=True, exclude=("author",))
 
+    @staticmethod
+    def loader_options():
+        """Loading polls the schema dumps in a fixed number of queries, other relationships raise"""
+        return (
+            orm.selectinload(User.polls).raiseload("*"),
+            orm.selectinload(User.polls).selectinload(Poll.options).raiseload("*"),
+            orm.raiseload("*"),
+        )
+
+
+class UserSummarySchema(marshmallow.Schema):
+    """User fields for lists, dumped from rows of the column-only summary query"""
+    id = marshmallow.fields.Integer()
+    email = marshmallow.fields.String()
+    username = marshmallow.fields.String()
+    created_at = marshmallow.fields.DateTime()
+    bio = marshmallow.fields.String()
+    group = marshmallow.fields.Integer()
+    avatar_filename = marshmallow.fields.String()
+    verified = marshmallow.fields.Boolean()
+    banned = marshmallow.fields.Boolean()
+    points = marshmallow.fields.Integer()
+    email_confirmed = marshmallow.fields.Boolean()
+    poll_count = marshmallow.fields.Integer()
+
+    @staticmethod
+    def query(session):
+        poll_count = select([func.count(Poll.id)]).where(Poll.author_id == User.id).as_scalar()
+        return session.query(User.id, User.email, User.username, User.created_at, User.bio, User.group,
+                             User.avatar_filename, User.verified, User.banned, User.points, User.email_confirmed,
+                             User.version, poll_count.label("poll_count"))
+
+
+class UserListArgsSchema(marshmallow.Schema):
+    class Meta:
+        unknown = marshmallow.EXCLUDE
+
+    cursor = marshmallow.fields.String()
+    limit = marshmallow.fields.Integer(missing=DEFAULT_LIMIT, validate=validate.Range(min=1, max=MAX_LIMIT))
+    group = marshmallow.fields.Integer()
+    banned = marshmallow.fields.Boolean()
+    verified = marshmallow.fields.Boolean()
+    email_confirmed = marshmallow.fields.Boolean()
+    username = marshmallow.fields.String(validate=validate.Length(min=1, max=User.max_username_length))
+
 
 class UserChangePasswordSchema(marshmallow.Schema):
     token = marshmallow.fields.String(required=True)
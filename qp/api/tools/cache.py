@@ -0,0 +1,239 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request
+from sqlalchemy import true
+
+from . import errors
+from ..database import db_session
+from ..models.users import User, UserSnapshot
+
+_missing = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache, whose entries expire after ttl seconds.
+
+    With max_bytes the total len() of cached values is capped too.
+    """
+    def __init__(self, max_size=1024, ttl=60, max_bytes=None):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self):
+        """Counter of invalidations, pass it to set() of values loaded after reading it"""
+        with self._lock:
+            return self._generation
+
+    def configure(self, max_size, ttl, max_bytes=None):
+        """Changing cache limits, dropping cached entries"""
+        with self._lock:
+            self.max_size = max_size
+            self.max_bytes = max_bytes
+            self.ttl = ttl
+            self._items.clear()
+            self._bytes = 0
+            self._generation += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                expires_at, value, size = item
+                if expires_at > time.monotonic():
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._pop(key)
+            self.misses += 1
+            return default
+
+    def set(self, key, value, generation=None):
+        """Caching value. It is dropped if the cache was invalidated after the given generation"""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            size = len(value) if self.max_bytes is not None else 0
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._pop(key)
+            self._items[key] = (time.monotonic() + self.ttl, value, size)
+            self._bytes += size
+            while len(self._items) > self.max_size or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._pop(next(iter(self._items)))
+
+    def get_or_load(self, key, load):
+        """Getting cached value, loading and caching it on miss. None values are not cached"""
+        value = self.get(key, _missing)
+        if value is not _missing:
+            return value
+        generation = self.generation
+        value = load(key)
+        if value is not None:
+            self.set(key, value, generation)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._pop(key)
+            self._generation += 1
+
+    def invalidate_where(self, predicate):
+        """Dropping entries, for whose key and value predicate is true"""
+        with self._lock:
+            for key in [key for key, (_, value, _) in self._items.items() if predicate(key, value)]:
+                self._pop(key)
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            requests_count = self.hits + self.misses
+            stats = {
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / requests_count, 4) if requests_count else None,
+            }
+            if self.max_bytes is not None:
+                stats.update(bytes=self._bytes, max_bytes=self.max_bytes)
+            return stats
+
+    def _pop(self, key):
+        item = self._items.pop(key, None)
+        if item is not None:
+            self._bytes -= item[2]
+
+
+# Snapshots of users for current_user, keyed by id
+users = TTLCache()
+
+
+def load_user(user_id):
+    session = db_session.create_session()
+    user = session.query(User).get(user_id)
+    return UserSnapshot(user) if user else None
+
+
+def get_user(user_id):
+    """Getting read-only snapshot of the user from the cache or the database"""
+    return users.get_or_load(user_id, load_user)
+
+
+def invalidate_user(*user_ids):
+    """Dropping cached users and poll responses, which show them, after their changes were committed"""
+    users.invalidate(*user_ids)
+    invalidate_responses(*(("user", user_id) for user_id in user_ids), "polls")
+
+
+# Ids of banned users for the ban check of pages
+banned_users = TTLCache(max_size=1)
+
+
+def load_banned_users(_key):
+    session = db_session.create_session()
+    return frozenset(user_id for user_id, in session.query(User.id).filter(User.banned == true()))
+
+
+def is_banned(user_id):
+    return user_id in banned_users.get_or_load("ids", load_banned_users)
+
+
+def invalidate_banned_users():
+    """Reloading banned users after ban status of somebody was changed"""
+    banned_users.clear()
+
+
+# Revocation table: auth versions of users, whose tokens were revoked at least once
+auth_versions = TTLCache(max_size=1)
+
+
+def load_auth_versions(_key):
+    session = db_session.create_session()
+    return dict(session.query(User.id, User.auth_version).filter(User.auth_version > 0))
+
+
+def get_auth_version(user_id):
+    return auth_versions.get_or_load("versions", load_auth_versions).get(user_id, 0)
+
+
+def invalidate_auth_versions():
+    """Reloading revocation table after auth version of somebody was bumped"""
+    auth_versions.clear()
+
+
+class LazyUser:
+    """current_user, which loads the user snapshot on first access to anything but id"""
+    __slots__ = ("id", "_user")
+
+    def __init__(self, user_id):
+        object.__setattr__(self, "id", user_id)
+        object.__setattr__(self, "_user", None)
+
+    def __getattr__(self, key):
+        if self._user is None:
+            user = get_user(self.id)
+            if user is None:
+                raise errors.UserNotFoundError
+            object.__setattr__(self, "_user", user)
+        return getattr(self._user, key)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("User snapshot is read-only")
+
+    def __repr__(self):
+        return f"<LazyUser> {self.id}"
+
+
+class CachedResponse:
+    """JSON body and ETag of a cached response with tags of the data it shows, its len() is the body size"""
+    __slots__ = ("body", "etag", "tags")
+
+    def __init__(self, body, etag, tags):
+        self.body = body
+        self.etag = etag
+        self.tags = frozenset(tags)
+
+    def __len__(self):
+        return len(self.body)
+
+
+# JSON of poll responses for anonymous users, keyed by endpoint, arguments and locale
+responses = TTLCache(max_size=512, ttl=30, max_bytes=16 * 1024 * 1024)
+# Key of tags of the current response in WSGI environ, loopback API requests have their own
+RESPONSE_TAGS_KEY = "qp.response_tags"
+
+
+def tag_response(*tags):
+    """Tagging the response of the current request with the data it shows, so its cached copy is invalidated"""
+    tags_set = request.environ.get(RESPONSE_TAGS_KEY)
+    if tags_set is not None:
+        tags_set.update(tags)
+
+
+def invalidate_responses(*tags):
+    """Dropping cached responses with any of the tags"""
+    tags = frozenset(tags)
+    responses.invalidate_where(lambda key, value: not tags.isdisjoint(value.tags))
+
+
+def invalidate_poll(poll_id):
+    """Dropping cached responses of the poll and poll lists after poll changes were committed"""
+    invalidate_responses(("poll", poll_id), "polls")
@@ -1,15 +1,89 @@
+from sqlalchemy import desc, distinct, exists, false, func, select
+
 from ..database import db_session
-from ..models.users import User, OwnerGroup
+from ..models.polls import Poll, Option, Vote, Comment
+from ..models.users import User, OwnerGroup, Points
 
 
 def create_owner_user():
     """Create default owner user on database first initialization"""
     session = db_session.create_session()
+    try:
+        users = session.query(User).first()
+        if not users:
+            owner = User(email="admin@change.email", username="admin", group=OwnerGroup.id)
+            owner.set_password("admin")
+
+            session.add(owner)
+            session.commit()
+    finally:
+        session.close()
+
+
+def reconcile_counters(session):
+    """Rebuilding denormalized counters of options and polls from votes and comments"""
+    vote_count = select([func.count(Vote.id)]).where(Vote.option_id == Option.id).as_scalar()
+    session.query(Option).update({Option.vote_count: vote_count}, synchronize_session=False)
+
+    participants_count = select([func.count(distinct(Vote.user_id))]) \
+        .where(Vote.option_id == Option.id).where(Option.poll_id == Poll.id).as_scalar()
+    session.query(Poll).update({Poll.participants_count: participants_count}, synchronize_session=False)
+
+    comment_count = select([func.count(Comment.id)]).where(Comment.poll_id == Poll.id).as_scalar()
+    session.query(Poll).update({Poll.comment_count: comment_count}, synchronize_session=False)
+
+    session.commit()
+
+
+def bump_poll_versions(session, condition):
+    """Bumping versions of the polls matching the condition and of their authors, whose responses show them"""
+    session.query(User).filter(User.id.in_(select([Poll.author_id]).where(condition))).update(
+        {User.version: User.version + 1}, synchronize_session=False)
+    session.query(Poll).filter(condition).update({Poll.version: Poll.version + 1}, synchronize_session=False)
+
+
+def save_vote(session, user_id, poll_id, option_id):
+    """Saving vote of the user for the option of the poll with its counters, points and versions, without commit"""
+    user_vote = (Vote.user_id == user_id) & (Vote.poll_id == poll_id)
+    voted = exists().where(user_vote)
+    voted_for_option = exists().where(user_vote & (Vote.option_id == option_id))
+
+    # The first statement takes the database write lock, so the checks below cannot race with another vote
+    session.query(Option).filter(Option.id.in_(select([Vote.option_id]).where(user_vote)),
+                                 Option.id != option_id).update(
+        {Option.vote_count: Option.vote_count - 1}, synchronize_session=False)
+    session.query(Option).filter(Option.id == option_id, ~voted_for_option).update(
+        {Option.vote_count: Option.vote_count + 1}, synchronize_session=False)
+    session.query(Poll).filter(Poll.id == poll_id, ~voted).update(
+        {Poll.participants_count: Poll.participants_count + 1}, synchronize_session=False)
+    session.query(User).filter(User.id == user_id, ~voted).update(
+        {User.points: User.points + Points.vote, User.version: User.version + 1}, synchronize_session=False)
+    bump_poll_versions(session, Poll.id == poll_id)
+    session.execute(Vote.upsert, dict(user_id=user_id, poll_id=poll_id, option_id=option_id))
+
+
+def get_hot_queries(session):
+    """Queries of the API that must be served by indexes, with names of expected indexes"""
+    return {
+        "poll options": (session.query(Option).filter(Option.poll_id == 1), "ix_options_poll_id"),
+        "option voters": (session.query(Vote).filter(Vote.option_id == 1), "ix_votes_option_id"),
+        "user poll vote": (session.query(Vote).filter(Vote.user_id == 1, Vote.poll_id == 1),
+                           "uq_votes_user_id_poll_id"),
+        "poll comments": (session.query(Comment).filter(Comment.poll_id == 1).order_by(desc(Comment.created_at)),
+                          "ix_comments_poll_id_created_at"),
+        "user polls": (session.query(Poll).filter(Poll.author_id == 1).order_by(desc(Poll.created_at)),
+                       "ix_polls_author_id_created_at"),
+        "public polls": (session.query(Poll).filter(Poll.deleted == false(), Poll.private == false())
+                         .order_by(desc(Poll.created_at)), "ix_polls_public_created_at"),
+    }
 
-    users = session.query(User).first()
-    if not users:
-        owner = User(email="admin@change.email", username="admin", group=OwnerGroup.id)
-        owner.set_password("admin")
 
-        session.add(owner)
-        session.commit()
+def explain_query_plans(session):
+    """Checking with EXPLAIN QUERY PLAN that hot queries use their indexes"""
+    dialect = session.bind.dialect
+    results = dict()
+    for name, (query, index) in get_hot_queries(session).items():
+        sql = str(query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+        plan = [row[-1] for row in session.execute("EXPLAIN QUERY PLAN " + sql)]
+        results[name] = (index, any(index in line for line in plan), plan)
+    return results
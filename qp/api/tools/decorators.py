@@ -1,8 +1,13 @@
 from functools import wraps
 
-from flask_jwt_extended import verify_jwt_in_request, current_user
-
-from . import errors
+from flask import current_app, request
+from flask_babel import get_locale
+from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from sqlalchemy.exc import OperationalError
+
+from . import cache, errors
+from .response import make_not_modified
+from ..database import db_session
 from ..models.users import ModeratorGroup, AdminGroup, OwnerGroup
 
 
@@ -29,7 +34,8 @@ def user_required():
                 verify_jwt_in_request()
             except Exception:
                 raise errors.NoAuthError
-            if current_user.banned:
+            claims = get_jwt()
+            if claims["banned"]:
                 raise errors.UserBannedError
             return func(*args, **kwargs)
 
@@ -46,9 +52,10 @@ def moderator_required():
                 verify_jwt_in_request()
             except Exception:
                 raise errors.NoAuthError
-            if current_user.banned:
+            claims = get_jwt()
+            if claims["banned"]:
                 raise errors.UserBannedError
-            if not ModeratorGroup.is_belong(current_user.group):
+            if not ModeratorGroup.is_belong(claims["group"]):
                 raise errors.AccessDeniedError
             return func(*args, **kwargs)
 
@@ -65,9 +72,10 @@ def admin_required():
                 verify_jwt_in_request()
             except Exception:
                 raise errors.NoAuthError
-            if current_user.banned:
+            claims = get_jwt()
+            if claims["banned"]:
                 raise errors.UserBannedError
-            if not AdminGroup.is_belong(current_user.group):
+            if not AdminGroup.is_belong(claims["group"]):
                 raise errors.AccessDeniedError
             return func(*args, **kwargs)
 
@@ -84,12 +92,62 @@ def owner_required():
                 verify_jwt_in_request()
             except Exception:
                 raise errors.NoAuthError
-            if current_user.banned:
+            claims = get_jwt()
+            if claims["banned"]:
                 raise errors.UserBannedError
-            if not OwnerGroup.is_belong(current_user.group):
+            if not OwnerGroup.is_belong(claims["group"]):
                 raise errors.AccessDeniedError
             return func(*args, **kwargs)
 
         return decorator
 
     return wrapper
+
+
+def database_write(serialize=True):
+    def wrapper(func):
+        @wraps(func)
+        def decorator(*args, **kwargs):
+            try:
+                return db_session.run_write(func, *args, serialize=serialize, **kwargs)
+            except OperationalError as e:
+                if db_session.is_locked_error(e):
+                    raise errors.DatabaseBusyError
+                raise
+
+        return decorator
+
+    return wrapper
+
+
+def anonymous_cache():
+    """Caching JSON of successful responses to anonymous users. The view tags them with cache.tag_response()"""
+    def wrapper(func):
+        @wraps(func)
+        def decorator(*args, **kwargs):
+            if request.cookies.get("access_token_cookie") or request.headers.get("Authorization"):
+                return func(*args, **kwargs)
+
+            key = (request.endpoint, tuple(sorted(kwargs.items())),
+                   tuple(sorted(request.args.items(multi=True))), str(get_locale()))
+            cached = cache.responses.get(key)
+            if cached is not None:
+                not_modified = make_not_modified(cached.etag) if cached.etag else None
+                if not_modified:
+                    return not_modified
+                response = current_app.response_class(cached.body, mimetype="application/json")
+                if cached.etag:
+                    response.set_etag(cached.etag)
+                return response
+
+            generation = cache.responses.generation
+            tags = request.environ[cache.RESPONSE_TAGS_KEY] = set()
+            response = func(*args, **kwargs)
+            if response.status_code == 200:
+                cache.responses.set(key, cache.CachedResponse(response.get_data(), response.get_etag()[0], tags),
+                                    generation)
+            return response
+
+        return decorator
+
+    return wrapper
@@ -1,4 +1,4 @@
-from flask import jsonify
+from .response import jsonify
 
 
 class ApiError(Exception):
@@ -7,9 +7,11 @@ class ApiError(Exception):
     sub_code = 0
     message = "Error."
     payload = None
+    headers = None
 
-    def __init__(self, payload=None):
+    def __init__(self, payload=None, headers=None):
         self.payload = payload
+        self.headers = headers
 
     def to_dict(self):
         data_error = {"code": self.sub_code}
@@ -20,6 +22,8 @@ class ApiError(Exception):
     def create_response(self):
         response = jsonify(self.to_dict())
         response.status_code = self.status_code
+        if self.headers:
+            response.headers.extend(self.headers)
         return response
 
     @classmethod
@@ -42,6 +46,24 @@ class DatabaseError(ApiError):
     message = "Database error."
 
 
+class DatabaseBusyError(ApiError):
+    status_code = 503
+    sub_code = 6
+    message = "Database is busy. Try again."
+
+
+class PasswordHashingBusyError(ApiError):
+    status_code = 503
+    sub_code = 7
+    message = "Server is busy. Try again."
+
+
+class TooManyRequestsError(ApiError):
+    status_code = 429
+    sub_code = 8
+    message = "Too many requests. Try again later."
+
+
 class InvalidRequestError(ApiError):
     status_code = 400
     sub_code = 3
@@ -158,3 +180,9 @@ class CommentNotFoundError(ApiError):
     status_code = 404
     sub_code = 130
     message = "Comment not found."
+
+
+class BroadcastNotFoundError(ApiError):
+    status_code = 404
+    sub_code = 140
+    message = "Broadcast not found."
@@ -0,0 +1,131 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from flask import request, has_request_context
+
+# Key of request stats in WSGI environ, so loopback API requests get their own stats
+ENVIRON_KEY = "qp.metrics"
+# Upper bounds of request latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+TIMINGS = ("sql", "serialization", "loopback")
+
+
+class Metrics:
+    """Per-endpoint request metrics, rendered in Prometheus text format"""
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, duration, stats):
+        with self._lock:
+            metrics = self._endpoints.get(endpoint)
+            if metrics is None:
+                metrics = self._endpoints[endpoint] = {"buckets": [0] * len(BUCKETS), "count": 0, "sum": 0.0,
+                                                       "sql_count": 0, **{timing: 0.0 for timing in TIMINGS}}
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    metrics["buckets"][i] += 1
+            metrics["count"] += 1
+            metrics["sum"] += duration
+            metrics["sql_count"] += stats["sql_count"]
+            for timing in TIMINGS:
+                metrics[timing] += stats[timing]
+
+    def render(self):
+        with self._lock:
+            endpoints = {endpoint: dict(metrics, buckets=list(metrics["buckets"]))
+                         for endpoint, metrics in sorted(self._endpoints.items())}
+
+        lines = ["# HELP qp_request_duration_seconds Request latency.",
+                 "# TYPE qp_request_duration_seconds histogram"]
+        for endpoint, metrics in endpoints.items():
+            for bound, count in zip(BUCKETS, metrics["buckets"]):
+                lines.append(f'qp_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+            lines.append(f'qp_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {metrics["count"]}')
+            lines.append(f'qp_request_duration_seconds_sum{{endpoint="{endpoint}"}} {metrics["sum"]:.6f}')
+            lines.append(f'qp_request_duration_seconds_count{{endpoint="{endpoint}"}} {metrics["count"]}')
+
+        counters = (
+            ("qp_sql_statements_total", "SQL statements executed.", "sql_count"),
+            ("qp_sql_duration_seconds_total", "Time spent in SQL statements.", "sql"),
+            ("qp_serialization_duration_seconds_total", "Time spent in dumping schemas.", "serialization"),
+            ("qp_loopback_duration_seconds_total", "Time spent in API requests made by views.", "loopback"),
+        )
+        for name, description, key in counters:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            for endpoint, metrics in endpoints.items():
+                value = metrics[key]
+                lines.append(f'{name}{{endpoint="{endpoint}"}} {value if key == "sql_count" else f"{value:.6f}"}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def get_request_stats():
+    """Stats of the current request, None outside of it"""
+    if not has_request_context():
+        return None
+    return request.environ.get(ENVIRON_KEY)
+
+
+@contextmanager
+def measure(timing):
+    """Adding time of the block to the timing of the current request"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = get_request_stats()
+        if stats is not None:
+            stats[timing] += time.perf_counter() - started
+
+
+def start_request():
+    request.environ[ENVIRON_KEY] = {"started": time.perf_counter(), "sql_count": 0,
+                                    **{timing: 0.0 for timing in TIMINGS}}
+
+
+def finish_request(response, server_timing=False):
+    stats = request.environ.get(ENVIRON_KEY)
+    if stats is None:
+        return response
+    duration = time.perf_counter() - stats["started"]
+    metrics.observe(request.endpoint or "unknown", duration, stats)
+    if server_timing:
+        response.headers["Server-Timing"] = ", ".join((
+            f"app;dur={duration * 1000:.1f}",
+            f'sql;dur={stats["sql"] * 1000:.1f};desc="{stats["sql_count"]} statements"',
+            f"serialization;dur={stats['serialization'] * 1000:.1f}",
+            f"loopback;dur={stats['loopback'] * 1000:.1f}",
+        ))
+    return response
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("qp_query_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["qp_query_started"].pop()
+    stats = get_request_stats()
+    if stats is not None:
+        stats["sql_count"] += 1
+        stats["sql"] += time.perf_counter() - started
+
+
+def handle_error(context):
+    if context.connection is not None and context.connection.info.get("qp_query_started"):
+        context.connection.info["qp_query_started"].pop()
+
+
+def init_app(app, engine):
+    """Registering request and engine hooks"""
+    sa.event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    sa.event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    sa.event.listen(engine, "handle_error", handle_error)
+    app.before_request(start_request)
+    app.after_request(lambda response: finish_request(response, app.config["METRICS_SERVER_TIMING"]))
@@ -0,0 +1,259 @@
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask_mail import Message
+
+from qp import mail
+from ..database import db_session
+from ..models.mail import OutboxMessage, Broadcast
+from ..models.users import User
+
+worker = None
+
+
+def send(message):
+    """Saving rendered message to the outbox, the worker sends it in background"""
+    session = db_session.create_session()
+    session.add(OutboxMessage(subject=message.subject,
+                              recipients=OutboxMessage.recipients_separator.join(message.recipients),
+                              html=message.html))
+    session.commit()
+    wake()
+
+
+def wake():
+    """Waking the worker up to send new messages and broadcasts"""
+    if worker:
+        worker.wake()
+
+
+def init_worker(app):
+    """Starting background outbox worker of the process"""
+    global worker
+
+    if worker or not app.config["MAIL_OUTBOX_WORKER"]:
+        return
+    worker = OutboxWorker(app)
+    worker.start()
+
+
+class OutboxWorker:
+    """Sending outbox messages over one kept-alive SMTP connection, retrying failed ones with backoff"""
+    def __init__(self, app):
+        self.app = app
+        self.config = app.config
+        self._wakeup = threading.Event()
+        self._connection = None
+        self._last_sent_at = 0
+
+    def start(self):
+        threading.Thread(target=self.run, name="outbox-worker", daemon=True).start()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def run(self):
+        while True:
+            self._wakeup.wait(self.config["MAIL_OUTBOX_POLL_INTERVAL"])
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    self.drain()
+                    self.drain_broadcasts()
+            except Exception:
+                self.app.logger.exception("Sending outbox messages failed")
+                self.disconnect()
+            if time.monotonic() - self._last_sent_at > self.config["MAIL_OUTBOX_IDLE_TIMEOUT"]:
+                self.disconnect()
+
+    def drain(self):
+        """Sending due messages until there are none left, returns numbers of sent and failed messages"""
+        sent = failed = 0
+        while True:
+            message_ids = self.get_due_message_ids()
+            if not message_ids:
+                return sent, failed
+            for message_id in message_ids:
+                result = self.process(message_id)
+                if result is True:
+                    sent += 1
+                elif result is False:
+                    failed += 1
+
+    def get_due_message_ids(self):
+        session = db_session.create_session()
+        query = session.query(OutboxMessage.id).filter(
+            OutboxMessage.sent_at.is_(None),
+            OutboxMessage.next_attempt_at <= datetime.utcnow(),
+            OutboxMessage.attempts < self.config["MAIL_OUTBOX_MAX_ATTEMPTS"])
+        query = query.order_by(OutboxMessage.next_attempt_at).limit(self.config["MAIL_OUTBOX_BATCH_SIZE"])
+        message_ids = [message_id for message_id, in query]
+        session.commit()
+        return message_ids
+
+    def process(self, message_id):
+        """Sending message if no other worker took it. Returns None if it was taken"""
+        if not db_session.run_write(self.claim, message_id):
+            return None
+
+        session = db_session.create_session()
+        message = session.query(OutboxMessage).get(message_id)
+        try:
+            self.deliver(Message(subject=message.subject,
+                                 recipients=message.recipients.split(OutboxMessage.recipients_separator),
+                                 html=message.html))
+        except Exception as e:
+            self.disconnect()
+            db_session.run_write(self.mark_failed, message_id, e)
+            return False
+        db_session.run_write(self.mark_sent, message_id)
+        return True
+
+    def claim(self, message_id):
+        """Leasing the message for the time of sending"""
+        now = datetime.utcnow()
+        session = db_session.create_session()
+        claimed = session.query(OutboxMessage).filter(
+            OutboxMessage.id == message_id,
+            OutboxMessage.sent_at.is_(None),
+            OutboxMessage.next_attempt_at <= now
+        ).update({OutboxMessage.next_attempt_at: now + timedelta(seconds=self.config["MAIL_OUTBOX_LEASE"])},
+                 synchronize_session=False)
+        session.commit()
+        return claimed == 1
+
+    def mark_sent(self, message_id):
+        session = db_session.create_session()
+        session.query(OutboxMessage).filter(OutboxMessage.id == message_id).update(
+            {OutboxMessage.sent_at: datetime.utcnow(), OutboxMessage.attempts: OutboxMessage.attempts + 1},
+            synchronize_session=False)
+        session.commit()
+
+    def mark_failed(self, message_id, error):
+        session = db_session.create_session()
+        message = session.query(OutboxMessage).get(message_id)
+        message.attempts += 1
+        delay = self.config["MAIL_OUTBOX_RETRY_DELAY"] * 2 ** (message.attempts - 1)
+        message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        message.last_error = repr(error)[:500]
+        session.commit()
+
+    def drain_broadcasts(self):
+        """Sending broadcasts, which no other worker is sending, chunk by chunk"""
+        session = db_session.create_session()
+        broadcast_ids = [broadcast_id for broadcast_id, in session.query(Broadcast.id).filter(
+            Broadcast.status.in_(("pending", "sending"))).order_by(Broadcast.id)]
+        session.commit()
+
+        for broadcast_id in broadcast_ids:
+            if db_session.run_write(self.claim_broadcast, broadcast_id):
+                while self.send_broadcast_chunk(broadcast_id):
+                    pass
+
+    def claim_broadcast(self, broadcast_id):
+        now = datetime.utcnow()
+        session = db_session.create_session()
+        claimed = session.query(Broadcast).filter(
+            Broadcast.id == broadcast_id,
+            Broadcast.status.in_(("pending", "sending")),
+            (Broadcast.locked_until.is_(None)) | (Broadcast.locked_until < now)
+        ).update({Broadcast.status: "sending",
+                  Broadcast.locked_until: now + timedelta(seconds=self.config["MAIL_OUTBOX_LEASE"])},
+                 synchronize_session=False)
+        session.commit()
+        return claimed == 1
+
+    def send_broadcast_chunk(self, broadcast_id):
+        """Sending broadcast to the next chunk of recipients, returns False when it is finished or has to be retried.
+        Progress is saved after every recipient, so nobody is mailed twice when sending is resumed.
+        Permanent errors count the recipient as failed, temporary ones stop the broadcast until a retry with backoff.
+        """
+        chunk_size = self.config["MAIL_BROADCAST_CHUNK_SIZE"]
+        session = db_session.create_session()
+        broadcast = session.query(Broadcast).get(broadcast_id)
+        subject, html = broadcast.subject, broadcast.html
+        recipients = session.query(User.id, User.email).filter(
+            User.id > broadcast.last_user_id, *broadcast.get_recipients_filter()
+        ).order_by(User.id).limit(chunk_size).all()
+        session.commit()
+
+        for user_id, email in recipients:
+            try:
+                self.deliver(Message(subject=subject, recipients=[email], html=html))
+                sent, failed = 1, 0
+            except Exception as e:
+                if not self.is_permanent_error(e):
+                    self.disconnect()
+                    db_session.run_write(self.retry_broadcast, broadcast_id, e)
+                    return False
+                sent, failed = 0, 1
+            db_session.run_write(self.update_broadcast, broadcast_id, user_id, sent, failed, False)
+
+        done = len(recipients) < chunk_size
+        if done:
+            db_session.run_write(self.update_broadcast, broadcast_id, None, 0, 0, True)
+        return not done
+
+    @staticmethod
+    def is_permanent_error(error):
+        """Refused recipients and 5xx replies fail the same way on every retry"""
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return True
+        return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+    def update_broadcast(self, broadcast_id, last_user_id, sent, failed, done):
+        now = datetime.utcnow()
+        values = {Broadcast.sent: Broadcast.sent + sent,
+                  Broadcast.failed: Broadcast.failed + failed,
+                  Broadcast.locked_until: now + timedelta(seconds=self.config["MAIL_OUTBOX_LEASE"])}
+        if last_user_id is not None:
+            values.update({Broadcast.last_user_id: last_user_id, Broadcast.attempts: 0})
+        if done:
+            values.update({Broadcast.status: "done", Broadcast.finished_at: now, Broadcast.locked_until: None})
+        session = db_session.create_session()
+        session.query(Broadcast).filter(Broadcast.id == broadcast_id).update(values, synchronize_session=False)
+        session.commit()
+
+    def retry_broadcast(self, broadcast_id, error):
+        """Releasing the broadcast for a retry with backoff, failing it after too many attempts"""
+        now = datetime.utcnow()
+        session = db_session.create_session()
+        broadcast = session.query(Broadcast).get(broadcast_id)
+        broadcast.attempts += 1
+        broadcast.last_error = repr(error)[:500]
+        if broadcast.attempts >= self.config["MAIL_OUTBOX_MAX_ATTEMPTS"]:
+            broadcast.status = "failed"
+            broadcast.finished_at = now
+            broadcast.locked_until = None
+        else:
+            delay = self.config["MAIL_OUTBOX_RETRY_DELAY"] * 2 ** (broadcast.attempts - 1)
+            broadcast.locked_until = now + timedelta(seconds=delay)
+        session.commit()
+
+    def deliver(self, msg):
+        try:
+            self.connect().send(msg)
+        except smtplib.SMTPServerDisconnected:
+            # Kept-alive connection was closed by the server
+            self.disconnect()
+            self.connect().send(msg)
+        self._last_sent_at = time.monotonic()
+
+    def connect(self):
+        if self._connection is None:
+            connection = mail.connect()
+            connection.__enter__()
+            self._connection = connection
+        return self._connection
+
+    def disconnect(self):
+        if self._connection is None:
+            return
+        try:
+            self._connection.__exit__(None, None, None)
+        except Exception:
+            pass
+        finally:
+            self._connection = None
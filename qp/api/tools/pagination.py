@@ -0,0 +1,41 @@
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+from . import errors
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def encode_cursor(created_at, item_id):
+    """Cursor pointing to the position after the item"""
+    raw = f"{created_at.isoformat()}|{item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, item_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(item_id)
+    except ValueError:
+        raise errors.InvalidRequestError({"cursor": ["Invalid cursor."]})
+
+
+def paginate(query, created_at_column, id_column, cursor=None, limit=DEFAULT_LIMIT):
+    """Keyset pagination on (created_at, id), newest first. Returns page items and next page cursor"""
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        # The first condition is an index range, the second one resolves items created at the same time
+        query = query.filter(created_at_column <= created_at,
+                             or_(created_at_column < created_at, and_(created_at_column == created_at,
+                                                                      id_column < item_id)))
+
+    items = query.order_by(created_at_column.desc(), id_column.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, created_at_column.key), getattr(last, id_column.key))
+    return items, next_cursor
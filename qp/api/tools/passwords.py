@@ -0,0 +1,73 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from . import errors
+
+__executor = None
+__slots = None
+__method = "pbkdf2:sha256:150000"
+__salt_length = 8
+
+
+def init(method=None, salt_length=None, workers=0, queue_size=0, server_threads=None):
+    """Password hashing init. Without workers hashes are computed in the calling thread.
+
+    Hashes being computed and waiting for a worker are limited to workers + queue_size, and with server_threads
+    to one less than the server threads, so a burst of logins cannot take every request thread.
+    """
+    global __executor, __slots, __method, __salt_length
+
+    if __executor:
+        __executor.shutdown()
+        __executor = None
+
+    if method:
+        __method = method
+    if salt_length:
+        __salt_length = salt_length
+    if workers:
+        # Workers are started at the first hash, when the process already runs threads, which must not be forked.
+        # Hashing needs only werkzeug, so the fork server doesn't preload __main__, which may create the app.
+        # Workers still import __main__ as __mp_main__, so scripts create the app under if __name__ == "__main__"
+        context = multiprocessing.get_context(
+            "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+        if context.get_start_method() == "forkserver":
+            context.set_forkserver_preload([])
+        __executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        # Hashes waiting for a worker and being computed, others are rejected
+        slots = workers + queue_size
+        if server_threads:
+            slots = max(1, min(slots, server_threads - 1))
+        __slots = threading.BoundedSemaphore(slots)
+
+
+def run(func, *args):
+    """Running CPU-bound hashing function in the worker pool, failing fast if its queue is full"""
+    if not __executor:
+        return func(*args)
+
+    if not __slots.acquire(blocking=False):
+        raise errors.PasswordHashingBusyError
+    try:
+        future = __executor.submit(func, *args)
+    except Exception:
+        __slots.release()
+        raise
+    future.add_done_callback(lambda _future: __slots.release())
+    return future.result()
+
+
+def hash_password(password):
+    return run(generate_password_hash, password, __method, __salt_length)
+
+
+def verify_password(hashed_password, password):
+    return run(check_password_hash, hashed_password, password)
+
+
+def needs_rehash(hashed_password):
+    """Checking if the hash was made with other method or iteration count than the configured ones"""
+    return hashed_password.split("$", 1)[0] != __method
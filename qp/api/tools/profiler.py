@@ -0,0 +1,195 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+import sqlalchemy as sa
+from flask import request, current_app
+from flask_jwt_extended import decode_token
+
+from .metrics import get_request_stats
+from .tokens import is_token_revoked
+from ..models.users import OwnerGroup
+
+# Key of request profile in WSGI environ
+ENVIRON_KEY = "qp.profile"
+# Query argument, which makes owners profile a single request
+PROFILE_ARG = "__profile"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+class Profile:
+    """Stack samples of a request thread"""
+    def __init__(self, thread_id, forced=False):
+        self.thread_id = thread_id
+        self.forced = forced
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.samples = {}
+
+    def add_sample(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        stack = tuple(reversed(stack))
+        self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def to_speedscope(self, name, interval):
+        """Profile in speedscope file format, weights are in milliseconds"""
+        frames = []
+        frame_indexes = {}
+        samples = []
+        weights = []
+        for stack, count in self.samples.items():
+            indexes = []
+            for frame in stack:
+                if frame not in frame_indexes:
+                    frame_indexes[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                indexes.append(frame_indexes[frame])
+            samples.append(indexes)
+            weights.append(round(count * interval * 1000, 3))
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "quick-polls",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 3),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class Sampler:
+    """Thread, which samples stacks of profiled request threads every interval seconds"""
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id, forced=False):
+        """Starting profile of the thread, None if it is already profiled by an outer request"""
+        with self._lock:
+            if thread_id in self._profiles:
+                return None
+            profile = self._profiles[thread_id] = Profile(thread_id, forced)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="qp-profiler", daemon=True)
+                self._thread.start()
+            self._active.set()
+        return profile
+
+    def stop(self, profile):
+        with self._lock:
+            self._profiles.pop(profile.thread_id, None)
+            if not self._profiles:
+                self._active.clear()
+
+    def get_profile(self, thread_id):
+        # Single dict lookup is atomic, so SQL statements of not profiled requests don't wait for the lock
+        return self._profiles.get(thread_id)
+
+    def run(self):
+        while True:
+            self._active.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, profile in self._profiles.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        profile.add_sample(frame)
+            del frames
+            time.sleep(self.interval)
+
+
+sampler = Sampler()
+
+
+def is_owner_request():
+    """Checking if the access token of the request belongs to an owner"""
+    access_token = request.cookies.get("access_token_cookie")
+    authorization = request.headers.get("Authorization", "")
+    if authorization.startswith("Bearer "):
+        access_token = authorization[len("Bearer "):]
+    if not access_token:
+        return False
+    try:
+        payload = decode_token(access_token)
+    except Exception:
+        return False
+    return not is_token_revoked(payload) and OwnerGroup.is_belong(payload.get("group"))
+
+
+def start_request():
+    forced = request.args.get(PROFILE_ARG) == "1" and is_owner_request()
+    if not (forced or current_app.config["PROFILER_ENABLED"]):
+        return
+    profile = sampler.start(threading.get_ident(), forced)
+    if profile is not None:
+        request.environ[ENVIRON_KEY] = profile
+
+
+def finish_request(response):
+    profile = request.environ.pop(ENVIRON_KEY, None)
+    if profile is None:
+        return response
+    sampler.stop(profile)
+    duration = time.perf_counter() - profile.started
+    if profile.forced or duration >= current_app.config["PROFILER_THRESHOLD"]:
+        filename = save_profile(profile, duration)
+        if profile.forced:
+            response.headers["X-Profile"] = filename
+    return response
+
+
+def stop_request(exception=None):
+    """Stopping profile of the request, which failed before its response was made"""
+    profile = request.environ.pop(ENVIRON_KEY, None)
+    if profile is not None:
+        sampler.stop(profile)
+
+
+def save_profile(profile, duration):
+    """Writing speedscope profile tagged with endpoint, SQL count and loopback time, returning its file name"""
+    endpoint = request.endpoint or "unknown"
+    stats = get_request_stats()
+    loopback = stats["loopback"] if stats is not None else 0.0
+    name = (f"{request.method} {request.path} ({endpoint}): {duration * 1000:.1f} ms, "
+            f"{profile.sql_count} SQL statements, {loopback * 1000:.1f} ms in loopback API requests")
+
+    folder = current_app.config["PROFILER_DIR"]
+    os.makedirs(folder, exist_ok=True)
+    safe_endpoint = re.sub(r"[^\w.-]", "_", endpoint)
+    filename = f"{datetime.utcnow():%Y%m%d-%H%M%S-%f}-{safe_endpoint}-{duration * 1000:.0f}ms.speedscope.json"
+    with open(os.path.join(folder, filename), "w") as file:
+        json.dump(profile.to_speedscope(name, sampler.interval), file)
+    current_app.logger.info("Profile of %s saved to %s", name, filename)
+    return filename
+
+
+def after_cursor_execute(*args):
+    profile = sampler.get_profile(threading.get_ident())
+    if profile is not None:
+        profile.sql_count += 1
+
+
+def init_app(app, engine):
+    """Registering request and engine hooks"""
+    sampler.interval = app.config["PROFILER_INTERVAL"]
+    sa.event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.teardown_request(stop_request)
@@ -0,0 +1,91 @@
+import hashlib
+import hmac
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+
+from . import errors
+
+# Header of loopback API requests of views with the address of the view's client, signed with SECRET_KEY
+CLIENT_ADDR_HEADER = "X-QP-Client-Addr"
+
+
+class TokenBucketLimiter:
+    """In-memory token buckets. Every check is O(1), the least recently used buckets are dropped over max_keys"""
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, count, period):
+        """Taking a token from the bucket, which gets count tokens per period and holds at most count of them.
+        Returns 0 if request is allowed, otherwise seconds until the next token.
+        """
+        now = time.monotonic()
+        rate = count / period
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (count, now))
+            tokens = min(count, tokens + (now - updated_at) * rate)
+            retry_after = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+limiter = TokenBucketLimiter()
+
+
+def sign_client_addr(addr):
+    signature = hmac.new(current_app.config["SECRET_KEY"].encode(), addr.encode(), hashlib.sha256).hexdigest()
+    return f"{addr};{signature}"
+
+
+def get_client_addr():
+    """Client address, for loopback API requests of views the address of the view's client"""
+    value = request.headers.get(CLIENT_ADDR_HEADER)
+    if value:
+        addr = value.rpartition(";")[0]
+        if hmac.compare_digest(value, sign_client_addr(addr)):
+            return addr
+    return request.remote_addr
+
+
+def get_client_key(key):
+    """Identifying client by ip or by user id, falling back to ip for guests"""
+    if key == "user":
+        user_id = get_jwt_identity()
+        if user_id is not None:
+            return f"user:{user_id}"
+    return f"ip:{get_client_addr()}"
+
+
+def rate_limit(name, key="ip"):
+    """Limiting requests by the RATE_LIMITS[name] rule, which is (count, period in seconds)"""
+    def wrapper(func):
+        @wraps(func)
+        def decorator(*args, **kwargs):
+            rule = current_app.config["RATE_LIMITS"].get(name)
+            if rule:
+                retry_after = limiter.hit(f"{name}:{get_client_key(key)}", *rule)
+                if retry_after:
+                    seconds = math.ceil(retry_after)
+                    raise errors.TooManyRequestsError({"retry_after": seconds}, headers={"Retry-After": str(seconds)})
+            return func(*args, **kwargs)
+
+        return decorator
+
+    return wrapper
@@ -1,4 +1,80 @@
-from flask import jsonify
+import hashlib
+import json
+from datetime import date
+
+from flask import request, current_app
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def default(obj):
+    """Encoding values, which are not JSON types. Dates are ISO 8601 strings, as orjson makes them"""
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+class JsonEncoder:
+    """Encoder of API responses on the standard library json module"""
+    name = "json"
+
+    def dumps(self, data, sort_keys=False, indent=False):
+        return json.dumps(data, default=default, ensure_ascii=False, sort_keys=sort_keys,
+                          indent=2 if indent else None, separators=None if indent else (",", ":")).encode()
+
+
+class OrjsonEncoder(JsonEncoder):
+    """Encoder of API responses on orjson, which encodes datetimes itself"""
+    name = "orjson"
+
+    def dumps(self, data, sort_keys=False, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=default, option=option)
+
+
+def get_encoders():
+    """Encoders, whose libraries are installed, fastest first"""
+    encoders = [JsonEncoder()]
+    if orjson is not None:
+        encoders.insert(0, OrjsonEncoder())
+    return encoders
+
+
+__encoder = get_encoders()[0]
+
+
+def init(name="auto"):
+    """Choosing response encoder by name, auto is the fastest installed one"""
+    global __encoder
+
+    encoders = {encoder.name: encoder for encoder in get_encoders()}
+    if name == "auto":
+        __encoder = get_encoders()[0]
+    elif name in encoders:
+        __encoder = encoders[name]
+    elif name == OrjsonEncoder.name:
+        raise RuntimeError("JSON encoder orjson is not installed.")
+    else:
+        raise ValueError(f"Unknown JSON encoder {name}.")
+
+
+def get_encoder():
+    return __encoder
+
+
+def jsonify(data):
+    """Create JSON response with the chosen encoder, following Flask JSON settings"""
+    app = current_app
+    body = __encoder.dumps(data, sort_keys=app.config["JSON_SORT_KEYS"],
+                           indent=app.config["JSONIFY_PRETTYPRINT_REGULAR"] or app.debug)
+    return app.response_class(body + b"\n", mimetype=app.config["JSONIFY_MIMETYPE"])
 
 
 def make_success_message(payload=None):
@@ -7,3 +83,23 @@ def make_success_message(payload=None):
         payload = dict()
     payload.update({"success": "ok"})
     return jsonify(payload)
+
+
+def make_etag(*versions):
+    """Strong ETag of the representation identified by ids and versions of the data it shows"""
+    return hashlib.sha1(repr(versions).encode()).hexdigest()
+
+
+def make_not_modified(etag):
+    """Empty 304 response if the client already has the representation with the ETag, otherwise None"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def make_etag_response(payload, etag):
+    response = jsonify(payload)
+    response.set_etag(etag)
+    return response
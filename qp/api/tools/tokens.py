@@ -0,0 +1,27 @@
+from flask_jwt_extended import create_access_token, create_refresh_token
+
+from .cache import get_auth_version
+
+
+def get_token_claims(user):
+    """Claims to authorize requests without loading the user"""
+    return {"group": user.group, "banned": user.banned, "auth_version": user.auth_version}
+
+
+def get_user_tokens(user):
+    claims = get_token_claims(user)
+    access_token = create_access_token(identity=user.id, additional_claims=claims)
+    refresh_token = create_refresh_token(identity=user.id, additional_claims=claims)
+    return {"access_token": access_token,
+            "refresh_token": refresh_token}
+
+
+def is_token_revoked(jwt_payload):
+    """Checking if access token was issued before the last ban, unban or group change of the user.
+    Refresh tokens are not revoked, the refresh takes actual claims from the database.
+    """
+    if jwt_payload["type"] != "access":
+        return False
+    if "auth_version" not in jwt_payload:
+        return True
+    return jwt_payload["auth_version"] < get_auth_version(jwt_payload["sub"])
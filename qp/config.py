@@ -11,9 +11,83 @@ class Config:
     JWT_COOKIE_SECURE = True
     JWT_COOKIE_CSRF_PROTECT = False
 
+    # Views call API resources in the same process instead of HTTP requests to itself
+    API_INTERNAL_DISPATCH = True
+
+    DATABASE_URL = "sqlite:///qp/db/app.db"
+    DATABASE_POOL_CLASS = "QueuePool"
+    DATABASE_POOL_SIZE = 10
+    DATABASE_POOL_PRE_PING = False
+    SQLITE_PRAGMAS = {}
+    # WAL journal, busy timeout and serialized writers
+    SQLITE_PERFORMANCE_MODE = True
+    DATABASE_WRITE_RETRIES = 5
+    DATABASE_WRITE_RETRY_DELAY = 0.05
+
+    # Werkzeug hash method with iteration count, changed hashes are updated on login
+    PASSWORD_HASH_METHOD = "pbkdf2:sha256:150000"
+    PASSWORD_SALT_LENGTH = 8
+    # Hashing runs in worker processes. Hashes being computed and queued are limited to
+    # PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE and to SERVER_THREADS - 1, so a burst of logins gets 503
+    # while other requests still have a thread
+    PASSWORD_HASH_WORKERS = 2
+    PASSWORD_HASH_QUEUE_SIZE = 1
+    # Request threads of the server, waitress-serve --threads (4 by default)
+    SERVER_THREADS = 4
+
+    # Token buckets of endpoints: (requests, period in seconds) per client
+    RATE_LIMITS = {
+        "login": (10, 60),
+        "register": (5, 3600),
+        "vote": (30, 60),
+        "comment": (10, 60),
+    }
+    RATE_LIMIT_MAX_KEYS = 10000
+    # Reverse proxies in front of the app, client addresses are taken from their X-Forwarded-For
+    TRUSTED_PROXIES = 0
+
+    # Request metrics at /metrics, Server-Timing response header
+    METRICS_ENABLED = True
+    METRICS_SERVER_TIMING = False
+
+    # Sampling profiler: with PROFILER_ENABLED every request is sampled and speedscope profiles of requests slower
+    # than PROFILER_THRESHOLD seconds are saved to PROFILER_DIR. Owners can profile a single request with ?__profile=1
+    PROFILER_ENABLED = False
+    PROFILER_INTERVAL = 0.005
+    PROFILER_THRESHOLD = 1.0
+    PROFILER_DIR = "qp/profiles"
+
+    # In-process cache of current_user snapshots
+    USER_CACHE_SIZE = 1024
+    USER_CACHE_TTL = 60
+
+    # In-process cache of poll and poll list JSON for anonymous users, limited by entries and total bytes
+    RESPONSE_CACHE_SIZE = 512
+    RESPONSE_CACHE_TTL = 30
+    RESPONSE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+    # Encoder of API responses: "orjson", "json" or "auto", which takes orjson if it is installed
+    JSON_ENCODER = "auto"
+
     MAIL_SERVER = "smtp.yandex.ru"
     MAIL_PORT = 465
     MAIL_USE_SSL = True
     MAIL_USERNAME = "noreply@quick-polls.xyz"
     MAIL_DEFAULT_SENDER = ("Quick Polls", MAIL_USERNAME)
     MAIL_PASSWORD = "MailPassword"
+
+    # Messages are saved to the outbox and sent by a background worker of the process
+    MAIL_OUTBOX_WORKER = True
+    MAIL_OUTBOX_POLL_INTERVAL = 5
+    MAIL_OUTBOX_BATCH_SIZE = 50
+    # Attempts of a message, or temporary errors in a row of a broadcast, before it fails
+    MAIL_OUTBOX_MAX_ATTEMPTS = 5
+    MAIL_OUTBOX_RETRY_DELAY = 30
+    # Seconds a worker holds a message while sending it
+    MAIL_OUTBOX_LEASE = 300
+    # SMTP connection is closed after this many idle seconds
+    MAIL_OUTBOX_IDLE_TIMEOUT = 60
+    # Messages sent over one SMTP connection before reconnecting
+    MAIL_MAX_EMAILS = 100
+    # Broadcast recipients loaded from the database at once
+    MAIL_BROADCAST_CHUNK_SIZE = 500
@@ -0,0 +1,39 @@
+"""mail outbox
+
+Revision ID: 0b7e3d5c9a21
+Revises: f4a06b9d2e18
+Create Date: 2026-10-18 14:20:51.630948
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7e3d5c9a21'
+down_revision = 'f4a06b9d2e18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbox',
+                    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+                    sa.Column('subject', sa.String(), nullable=False),
+                    sa.Column('recipients', sa.String(), nullable=False),
+                    sa.Column('html', sa.Text(), nullable=False),
+                    sa.Column('created_at', sa.DateTime(), nullable=True),
+                    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+                    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+                    sa.Column('sent_at', sa.DateTime(), nullable=True),
+                    sa.Column('last_error', sa.String(), nullable=True),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+    op.create_index('ix_outbox_pending_next_attempt_at', 'outbox', ['next_attempt_at'], unique=False,
+                    sqlite_where=sa.text('sent_at IS NULL'),
+                    postgresql_where=sa.text('sent_at IS NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_outbox_pending_next_attempt_at', table_name='outbox')
+    op.drop_table('outbox')
@@ -0,0 +1,32 @@
+"""vote counters
+
+Revision ID: 5e8d0c4a1f97
+Revises: a3c91f2b7d4e
+Create Date: 2026-10-18 10:03:17.582914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8d0c4a1f97'
+down_revision = 'a3c91f2b7d4e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('options', sa.Column('vote_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('polls', sa.Column('participants_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute("UPDATE options SET vote_count = "
+               "(SELECT count(votes.id) FROM votes WHERE votes.option_id = options.id)")
+    op.execute("UPDATE polls SET participants_count = "
+               "(SELECT count(DISTINCT votes.user_id) FROM votes JOIN options ON options.id = votes.option_id "
+               "WHERE options.poll_id = polls.id)")
+
+
+def downgrade():
+    op.drop_column('polls', 'participants_count')
+    op.drop_column('options', 'vote_count')
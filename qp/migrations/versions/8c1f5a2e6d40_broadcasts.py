@@ -0,0 +1,42 @@
+"""broadcasts
+
+Revision ID: 8c1f5a2e6d40
+Revises: 0b7e3d5c9a21
+Create Date: 2026-10-18 15:07:13.284590
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1f5a2e6d40'
+down_revision = '0b7e3d5c9a21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('broadcasts',
+                    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+                    sa.Column('author_id', sa.Integer(), nullable=True),
+                    sa.Column('subject', sa.String(), nullable=False),
+                    sa.Column('html', sa.Text(), nullable=False),
+                    sa.Column('group', sa.Integer(), nullable=True),
+                    sa.Column('verified', sa.Boolean(), nullable=True),
+                    sa.Column('email_confirmed', sa.Boolean(), nullable=True),
+                    sa.Column('status', sa.String(), nullable=False),
+                    sa.Column('total', sa.Integer(), nullable=False),
+                    sa.Column('sent', sa.Integer(), nullable=False),
+                    sa.Column('failed', sa.Integer(), nullable=False),
+                    sa.Column('last_user_id', sa.Integer(), nullable=False),
+                    sa.Column('locked_until', sa.DateTime(), nullable=True),
+                    sa.Column('created_at', sa.DateTime(), nullable=True),
+                    sa.Column('finished_at', sa.DateTime(), nullable=True),
+                    sa.ForeignKeyConstraint(['author_id'], ['users.id'], ondelete='SET NULL'),
+                    sa.PrimaryKeyConstraint('id')
+                    )
+
+
+def downgrade():
+    op.drop_table('broadcasts')
@@ -0,0 +1,41 @@
+"""polls indexes
+
+Revision ID: a3c91f2b7d4e
+Revises: 335bda1f3e0d
+Create Date: 2026-10-18 09:12:41.305127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c91f2b7d4e'
+down_revision = '335bda1f3e0d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Flags must not be NULL to match the partial index condition
+    op.execute("UPDATE polls SET deleted = 0 WHERE deleted IS NULL")
+    op.execute("UPDATE polls SET private = 0 WHERE private IS NULL")
+    op.execute("UPDATE polls SET completed = 0 WHERE completed IS NULL")
+
+    op.create_index('ix_polls_author_id_created_at', 'polls', ['author_id', 'created_at'], unique=False)
+    op.create_index('ix_polls_public_created_at', 'polls', ['created_at'], unique=False,
+                    sqlite_where=sa.text('deleted = 0 AND private = 0'),
+                    postgresql_where=sa.text('NOT deleted AND NOT private'))
+    op.create_index(op.f('ix_options_poll_id'), 'options', ['poll_id'], unique=False)
+    op.create_index('ix_votes_user_id_option_id', 'votes', ['user_id', 'option_id'], unique=False)
+    op.create_index(op.f('ix_votes_option_id'), 'votes', ['option_id'], unique=False)
+    op.create_index('ix_comments_poll_id_created_at', 'comments', ['poll_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_comments_poll_id_created_at', table_name='comments')
+    op.drop_index(op.f('ix_votes_option_id'), table_name='votes')
+    op.drop_index('ix_votes_user_id_option_id', table_name='votes')
+    op.drop_index(op.f('ix_options_poll_id'), table_name='options')
+    op.drop_index('ix_polls_public_created_at', table_name='polls')
+    op.drop_index('ix_polls_author_id_created_at', table_name='polls')
@@ -0,0 +1,26 @@
+"""broadcast attempts
+
+Revision ID: b62f0e4d8a17
+Revises: d3a87b15c6f2
+Create Date: 2026-10-19 10:14:52.716203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b62f0e4d8a17'
+down_revision = 'd3a87b15c6f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('broadcasts', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('broadcasts', sa.Column('last_error', sa.String(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('broadcasts', 'last_error')
+    op.drop_column('broadcasts', 'attempts')
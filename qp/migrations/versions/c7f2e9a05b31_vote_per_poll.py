@@ -0,0 +1,40 @@
+"""vote per poll
+
+Revision ID: c7f2e9a05b31
+Revises: 5e8d0c4a1f97
+Create Date: 2026-10-18 10:48:55.107342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7f2e9a05b31'
+down_revision = '5e8d0c4a1f97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('votes', sa.Column('poll_id', sa.Integer(), nullable=True))
+    op.execute("UPDATE votes SET poll_id = (SELECT options.poll_id FROM options WHERE options.id = votes.option_id)")
+
+    # Keeping only the latest vote of the user in every poll
+    op.execute("DELETE FROM votes WHERE id NOT IN (SELECT max(id) FROM votes GROUP BY user_id, poll_id)")
+    op.execute("UPDATE options SET vote_count = "
+               "(SELECT count(votes.id) FROM votes WHERE votes.option_id = options.id)")
+    op.execute("UPDATE polls SET participants_count = "
+               "(SELECT count(votes.id) FROM votes WHERE votes.poll_id = polls.id)")
+
+    with op.batch_alter_table('votes') as batch_op:
+        batch_op.alter_column('poll_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_votes_poll_id_polls', 'polls', ['poll_id'], ['id'], ondelete='CASCADE')
+        batch_op.create_index('uq_votes_user_id_poll_id', ['user_id', 'poll_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('votes') as batch_op:
+        batch_op.drop_index('uq_votes_user_id_poll_id')
+        batch_op.drop_constraint('fk_votes_poll_id_polls', type_='foreignkey')
+        batch_op.drop_column('poll_id')
@@ -0,0 +1,26 @@
+"""poll and user versions
+
+Revision ID: d3a87b15c6f2
+Revises: 8c1f5a2e6d40
+Create Date: 2026-10-18 16:21:48.530619
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a87b15c6f2'
+down_revision = '8c1f5a2e6d40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('polls', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    op.drop_column('users', 'version')
+    op.drop_column('polls', 'version')
@@ -0,0 +1,26 @@
+"""poll comment count
+
+Revision ID: e19b4d7a3c62
+Revises: c7f2e9a05b31
+Create Date: 2026-10-18 11:36:09.442871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e19b4d7a3c62'
+down_revision = 'c7f2e9a05b31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('polls', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute("UPDATE polls SET comment_count = "
+               "(SELECT count(comments.id) FROM comments WHERE comments.poll_id = polls.id)")
+
+
+def downgrade():
+    op.drop_column('polls', 'comment_count')
@@ -0,0 +1,24 @@
+"""user auth version
+
+Revision ID: f4a06b9d2e18
+Revises: e19b4d7a3c62
+Create Date: 2026-10-18 13:02:27.118354
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a06b9d2e18'
+down_revision = 'e19b4d7a3c62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('auth_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    op.drop_column('users', 'auth_version')
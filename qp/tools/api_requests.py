@@ -1,36 +1,81 @@
 import requests
-from flask import request
+from flask import request, current_app
 from flask_babel import get_locale
+from werkzeug.test import EnvironBuilder
+
+from qp.api.tools.metrics import measure
+from qp.api.tools.rate_limit import CLIENT_ADDR_HEADER, get_client_addr, sign_client_addr
+
+
+class ApiResponse:
+    """Response of in-process API request, compatible with requests.Response"""
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self._response = response
+
+    def json(self):
+        return self._response.get_json(force=True)
 
 
 class ApiRequest:
     """Making requests to app API"""
+    method = None
     request_function = None
 
     @classmethod
     def make_request(cls, *url_parts, **kwargs):
-        url = request.url_root + "api/" + "/".join(map(str, url_parts))
-        if not ("127.0.0.1:" in url or "localhost:" in url):
-            url = url.replace("http://", "https://")
-        headers = dict()
+        path = "api/" + "/".join(map(str, url_parts))
+        client_addr = get_client_addr() or "127.0.0.1"
+        headers = {CLIENT_ADDR_HEADER: sign_client_addr(client_addr)}
         access_token = request.cookies.get("access_token_cookie")
         if access_token:
-            headers = {"Authorization": f"Bearer {access_token}"}
+            headers["Authorization"] = f"Bearer {access_token}"
         lang = get_locale().language
-        return cls.request_function(url, headers=headers, cookies={"language": lang}, **kwargs)
+
+        with measure("loopback"):
+            if current_app.config.get("API_INTERNAL_DISPATCH"):
+                return cls.dispatch(path, client_addr, headers=headers, cookies={"language": lang}, **kwargs)
+
+            url = request.url_root + path
+            if not ("127.0.0.1:" in url or "localhost:" in url):
+                url = url.replace("http://", "https://")
+            return cls.request_function(url, headers=headers, cookies={"language": lang}, **kwargs)
+
+    @classmethod
+    def dispatch(cls, path, client_addr, headers, cookies, params=None, **kwargs):
+        """Running API resource in the current process without HTTP round trip"""
+        headers = dict(headers)
+        headers["Cookie"] = "; ".join(f"{key}={value}" for key, value in cookies.items())
+        builder = EnvironBuilder(path="/" + path, base_url=request.url_root, method=cls.method,
+                                 headers=headers, query_string=params,
+                                 environ_base={"REMOTE_ADDR": client_addr}, **kwargs)
+        try:
+            environ = builder.get_environ()
+        finally:
+            builder.close()
+
+        app = current_app._get_current_object()
+        with app.request_context(environ):
+            response = app.full_dispatch_request()
+        return ApiResponse(response)
 
 
 class ApiGet(ApiRequest):
+    method = "GET"
     request_function = requests.get
 
 
 class ApiPost(ApiRequest):
+    method = "POST"
     request_function = requests.post
 
 
 class ApiPut(ApiRequest):
+    method = "PUT"
     request_function = requests.put
 
 
 class ApiDelete(ApiRequest):
+    method = "DELETE"
     request_function = requests.delete
@@ -0,0 +1,39 @@
+import click
+
+from qp import app
+from qp.api.database import db_session
+from qp.api.tools.database import explain_query_plans, reconcile_counters
+from qp.api.tools.outbox import OutboxWorker
+
+
+@app.cli.command("check-query-plans")
+def check_query_plans():
+    """Check that hot queries use their indexes"""
+    session = db_session.create_session()
+    failed = False
+    for name, (index, used, plan) in explain_query_plans(session).items():
+        click.echo(f"{'ok' if used else 'FAIL'} {name}: expected {index}")
+        for line in plan:
+            click.echo(f"    {line}")
+        failed = failed or not used
+    if failed:
+        raise SystemExit(1)
+
+
+@app.cli.command("reconcile-counters")
+def reconcile_counters_command():
+    """Rebuild vote and comment counters of options and polls"""
+    reconcile_counters(db_session.create_session())
+    click.echo("Counters have been rebuilt.")
+
+
+@app.cli.command("send-outbox")
+def send_outbox():
+    """Send due messages of the mail outbox and pending broadcasts"""
+    worker = OutboxWorker(app)
+    try:
+        sent, failed = worker.drain()
+        worker.drain_broadcasts()
+    finally:
+        worker.disconnect()
+    click.echo(f"Sent: {sent}, failed: {failed}.")
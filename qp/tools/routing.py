@@ -0,0 +1,18 @@
+from flask import request
+
+# Kinds of requests, so global hooks do only the work the request needs
+STATIC = "static"
+API = "api"
+PAGE = "page"
+
+STATIC_PATHS = ("/favicon.ico", "/robots.txt")
+API_PREFIX = "/api/"
+
+
+def get_request_kind():
+    """Classifying the current request"""
+    if request.endpoint == "static" or request.path in STATIC_PATHS:
+        return STATIC
+    if request.path.startswith(API_PREFIX):
+        return API
+    return PAGE
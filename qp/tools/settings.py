@@ -3,13 +3,15 @@ import os
 from flask import redirect, make_response, url_for, flash, request
 from flask_babel import _
 from flask_jwt_extended import current_user, unset_jwt_cookies, \
-    unset_access_cookies, unset_refresh_cookies, jwt_required
+    unset_access_cookies, unset_refresh_cookies, decode_token
 
 from qp import babel, jwt, app
-from qp.api.database import db_session
-from qp.api.models.users import groups, get_group, User
+from qp.api.tools import cache
+from qp.api.tools.tokens import is_token_revoked
+from qp.api.models.users import groups, get_group
 from qp.tools.languages import LANGUAGES, GROUPS
 from qp.tools.moment import MomentJs
+from qp.tools.routing import get_request_kind, PAGE
 
 
 @babel.localeselector
@@ -22,12 +24,19 @@ def get_locale():
 
 
 @app.before_request
-@jwt_required(optional=True)
 def logout_if_banned():
-    """Logout if current user is banned"""
-    if request.path.startswith("/api"):
+    """Logout if current user is banned. Only pages are checked, static files and API skip JWT here"""
+    if get_request_kind() != PAGE:
         return
-    if current_user and current_user.banned:
+    access_token = request.cookies.get("access_token_cookie")
+    if not access_token:
+        return
+    try:
+        user_id = decode_token(access_token)["sub"]
+    except Exception:
+        # Expired and invalid tokens are handled by the view
+        return
+    if cache.is_banned(user_id):
         resp = make_response(redirect("/"))
         unset_jwt_cookies(resp)
         flash(_("You were banned."), "danger")
@@ -65,10 +74,14 @@ def user_identity_lookup(user_id):
 
 @jwt.user_lookup_loader
 def user_lookup_callback(_jwt_header, jwt_data):
-    """Getting current_user from database"""
-    user_id = jwt_data["sub"]
-    session = db_session.create_session()
-    return session.query(User).get(user_id)
+    """Getting current_user, its snapshot is loaded from cache or database on first use"""
+    return cache.LazyUser(jwt_data["sub"])
+
+
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(_jwt_header, jwt_data):
+    """Rejecting access tokens issued before changes of user permissions"""
+    return is_token_revoked(jwt_data)
 
 
 @jwt.unauthorized_loader
@@ -85,6 +98,14 @@ def invalid_token_callback(*args):
     return response
 
 
+@jwt.revoked_token_loader
+def revoked_token_callback(*args):
+    """Update token if user permissions were changed"""
+    response = make_response(redirect(f"/token/refresh?redirect={request.url}"))
+    unset_access_cookies(response)
+    return response
+
+
 @jwt.expired_token_loader
 def expired_token_callback(*args):
     """Update token if expired"""
@@ -1,8 +1,9 @@
-from flask import Blueprint, render_template, make_response, redirect, url_for
+from flask import Blueprint, render_template, make_response, redirect, url_for, abort
 from flask_babel import _
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import jwt_required, get_jwt
 
-from qp.api.models.users import Points
+from qp.api.models.users import Points, AdminGroup
+from qp.api.tools.metrics import metrics
 
 blueprint = Blueprint(
     "default",
@@ -36,3 +37,14 @@ def change_language(lang):
     resp = make_response(redirect("/"))
     resp.set_cookie("language", lang)
     return resp
+
+
+@blueprint.route("/metrics")
+@jwt_required()
+def metrics_info():
+    if not AdminGroup.is_belong(get_jwt()["group"]):
+        abort(403)
+    resp = make_response(metrics.render())
+    resp.mimetype = "text/plain"
+    resp.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    return resp
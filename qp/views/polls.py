@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, redirect, flash, url_for
+from flask import Blueprint, render_template, redirect, flash, url_for, request
 from flask_babel import _
 from flask_jwt_extended import jwt_required, current_user
 
@@ -19,12 +19,11 @@ blueprint = Blueprint(
 @jwt_required(optional=True)
 def polls_list():
     title = _("Polls")
-    polls = ApiGet.make_request("polls").json().get("polls")
-    if polls:
-        polls = list(filter(lambda poll: not poll["private"] and not poll["deleted"], polls))
-        for poll in polls:
-            poll["participants"] = sum([len(option["users"]) for option in poll["options"]])
-    return render_template("polls.html", title=title, polls=polls)
+    params = {"private": "false", "deleted": "false"}
+    if request.args.get("cursor"):
+        params["cursor"] = request.args["cursor"]
+    data = ApiGet.make_request("polls", params=params).json()
+    return render_template("polls.html", title=title, polls=data.get("polls"), next_cursor=data.get("next_cursor"))
 
 
 @blueprint.route("/polls/<int:poll_id>", methods=["GET", "POST"])
@@ -42,7 +41,10 @@ def poll_info(poll_id):
             flash(_("You have successfully voted"), "success")
             return redirect(url_for("polls.poll_info", poll_id=poll_id))
 
-        flash(INTERNAL_ERROR_MSG, "danger")
+        if errors.TooManyRequestsError.sub_code_match(resp.json()["error"]["code"]):
+            flash(_("Too many attempts. Try again later."), "danger")
+        else:
+            flash(INTERNAL_ERROR_MSG, "danger")
 
     if leave_comment_form.leave_comment_btn.data and leave_comment_form.validate():
         form_data = leave_comment_form.data.copy()
@@ -52,29 +54,33 @@ def poll_info(poll_id):
         if resp.status_code == 200:
             return redirect(url_for("polls.poll_info", poll_id=poll_id))
 
-        flash(INTERNAL_ERROR_MSG, "danger")
+        if errors.TooManyRequestsError.sub_code_match(resp.json()["error"]["code"]):
+            flash(_("Too many attempts. Try again later."), "danger")
+        else:
+            flash(INTERNAL_ERROR_MSG, "danger")
 
     poll = ApiGet.make_request("polls", poll_id).json().get("poll")
     user_voted = False
+    comments, next_comments_cursor = None, None
     if poll:
+        params = {"cursor": request.args["comments_cursor"]} if request.args.get("comments_cursor") else None
+        data = ApiGet.make_request("polls", poll_id, "comments", params=params).json()
+        comments, next_comments_cursor = data.get("comments"), data.get("next_cursor")
+
         title = poll["title"]
-        users_count = 0
+        users_count = poll["participants_count"]
         for option in poll.get("options"):
-            option["users_count"] = len(option["users"])
-            users_count += option["users_count"]
-
-            value = option["id"]
-            vote_form.options.choices.append((value, option["title"]))
-            if current_user and current_user.id in option["users"]:
-                vote_form.options.default = value
-                user_voted = True
+            vote_form.options.choices.append((option["id"], option["title"]))
+        if poll.get("voted_option_id") is not None:
+            vote_form.options.default = poll["voted_option_id"]
+            user_voted = True
         vote_form.process()
 
-        poll["users_count"] = users_count
         for option in poll.get("options"):
-            option["percent"] = int(option["users_count"] / users_count * 100) if users_count else 0
+            option["percent"] = int(option["vote_count"] / users_count * 100) if users_count else 0
     return render_template("poll_info.html", poll=poll, title=title,
-                           vote_form=vote_form, leave_comment_form=leave_comment_form, user_voted=user_voted)
+                           vote_form=vote_form, leave_comment_form=leave_comment_form, user_voted=user_voted,
+                           comments=comments, next_comments_cursor=next_comments_cursor)
 
 
 @blueprint.route("/polls/<int:poll_id>/edit", methods=["GET", "POST"])
@@ -1,10 +1,11 @@
 from flask import Blueprint, render_template, redirect, make_response, url_for, flash, request
 from flask_babel import _
 from flask_jwt_extended import set_access_cookies, set_refresh_cookies, unset_jwt_cookies, jwt_required, \
-    get_jwt_identity, create_access_token, create_refresh_token, current_user
+    get_jwt_identity, current_user
 
 from qp.api.models.users import User, groups, ModeratorGroup, AdminGroup
-from qp.api.tools import errors
+from qp.api.tools import cache, errors
+from qp.api.tools.tokens import get_user_tokens
 from qp.forms.user import RegisterForm, LoginForm, UserProfileForm, UserEmailForm, UserChangePasswordForm, \
     UserChangeGroupForm, UserChangePointsForm, SendResetPasswordEmailForm, ResetPasswordForm, UserSendCustomEmailForm
 from qp.tools.api_requests import ApiGet, ApiPost, ApiPut
@@ -47,6 +48,8 @@ def register():
                     form[field].errors += fields[field]
         elif errors.UserAlreadyExistsError.sub_code_match(code):
             flash(_("User already exists."), "danger")
+        elif errors.TooManyRequestsError.sub_code_match(code):
+            flash(_("Too many attempts. Try again later."), "danger")
         else:
             flash(INTERNAL_ERROR_MSG, "danger")
 
@@ -86,6 +89,8 @@ def login():
             flash(_("User not found."), "danger")
         elif errors.WrongCredentialsError.sub_code_match(code):
             flash(_("Wrong password."), "danger")
+        elif errors.TooManyRequestsError.sub_code_match(code):
+            flash(_("Too many attempts. Try again later."), "danger")
         else:
             flash(INTERNAL_ERROR_MSG, "danger")
 
@@ -103,14 +108,17 @@ def logout():
 @blueprint.route("/token/refresh", methods=['GET'])
 @jwt_required(refresh=True)
 def refresh():
-    identity = get_jwt_identity()
-    access_token = create_access_token(identity=identity)
-    refresh_token = create_refresh_token(identity=identity)
+    user = cache.get_user(get_jwt_identity())
+    if not user:
+        resp = redirect("/login")
+        unset_jwt_cookies(resp)
+        return resp
+    tokens = get_user_tokens(user)
 
     url = request.args["redirect"] if (request.args and "redirect" in request.args) else "/"
     resp = make_response(redirect(url))
-    set_access_cookies(resp, access_token)
-    set_refresh_cookies(resp, refresh_token)
+    set_access_cookies(resp, tokens["access_token"])
+    set_refresh_cookies(resp, tokens["refresh_token"])
     return resp
 
 
@@ -371,8 +379,6 @@ def user_manage_polls(username):
 
     polls = ApiGet.make_request("users", username, "polls").json().get("polls")
     polls = list(filter(lambda poll: not poll["deleted"], polls))
-    for poll in polls:
-        poll["participants"] = sum([len(option["users"]) for option in poll["options"]])
     return render_template("user_manage_polls.html", title=title, polls=polls)
 
 
@@ -415,10 +421,13 @@ def user_change_points(username):
 def users_list():
     title = _("Registered users")
 
-    users = ApiGet.make_request("users").json().get("users")
-    if not users:
+    params = {field: request.args[field] for field in ("cursor", "username") if request.args.get(field)}
+    response = ApiGet.make_request("users", params=params)
+    if response.status_code != 200:
         return redirect("/")
-    return render_template("users_list.html", title=title, users=users)
+    data = response.json()
+    return render_template("users_list.html", title=title, users=data["users"], next_cursor=data["next_cursor"],
+                           username=request.args.get("username", ""))
 
 
 @blueprint.route("/user/<username>/send_email", methods=['GET', 'POST'])
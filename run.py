@@ -2,7 +2,7 @@
 
 from qp import create_app
 
-app = create_app()
-
 if __name__ == "__main__":
+    # Password hashing workers import the main module again, which must not create another app
+    app = create_app()
     app.run(debug=True)
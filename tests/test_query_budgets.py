@@ -0,0 +1,8 @@
+from benchmarks.query_budgets import check_budgets
+
+
+def test_query_budgets():
+    """Every resource method stays within its SQL statement budget on small and large data"""
+    results, errors = check_budgets()
+    assert results
+    assert errors == []